@@ -0,0 +1,218 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+CACHE_FILE_NAME = '.build_cache.json'
+CACHE_VERSION = 1
+
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+# sha256 of files already hashed during this run, keyed by (path, size, mtime_ns), see BuildCache.reset
+_hash_memo = {}
+_hash_memo_lock = threading.Lock()
+
+
+def file_sha256(path) -> str:
+    path = os.fspath(path)
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    with _hash_memo_lock:
+        if key in _hash_memo:
+            return _hash_memo[key]
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    with _hash_memo_lock:
+        _hash_memo[key] = digest.hexdigest()
+    return _hash_memo[key]
+
+
+def _normalize_params(params) -> dict:
+    # compare params the way they come back from the json file (tuples become lists...)
+    return json.loads(json.dumps(params or {}))
+
+
+def fingerprint(path) -> dict:
+    stat = os.stat(path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': file_sha256(path)}
+
+
+def fingerprint_matches(recorded, path) -> bool:
+    """Compare a file against its recorded fingerprint, size+mtime first and the content hash if only the mtime changed."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return False
+    if stat.st_size != recorded.get('size'):
+        return False
+    if stat.st_mtime_ns == recorded.get('mtime_ns'):
+        return True
+    if file_sha256(path) != recorded.get('sha256'):
+        return False
+    # same content, only touched: remember the new mtime so the next check takes the fast path
+    recorded['mtime_ns'] = stat.st_mtime_ns
+    return True
+
+
+class BuildCache:
+    """Records how every converted file of a song folder was built.
+
+    Each artifact (ogg, preview, png, mp4/bk2, vxla...) is stored with the fingerprints of its input
+    files and the config values it was built with. It only needs rebuilding when one of those changed.
+    The cache lives in the song folder, so it follows the folder when it is renamed.
+    """
+
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.path = self.directory / CACHE_FILE_NAME
+        self._lock = threading.RLock()
+        self._data = self._load()
+
+    @classmethod
+    def for_dir(cls, directory) -> 'BuildCache':
+        """The shared cache instance of a song folder."""
+        key = os.path.abspath(os.fspath(directory))
+        with cls._instances_lock:
+            if key not in cls._instances:
+                cls._instances[key] = cls(directory)
+            return cls._instances[key]
+
+    @classmethod
+    def reset(cls) -> None:
+        """Drop the shared instances and the hashes seen so far, a new run reads the caches from disk again."""
+        with cls._instances_lock:
+            cls._instances.clear()
+        with _hash_memo_lock:
+            _hash_memo.clear()
+
+    def _load(self) -> dict:
+        if self.path.exists():
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if data.get('version') == CACHE_VERSION:
+                    return data
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable build cache {self.path}: {e}")
+        return {'version': CACHE_VERSION, 'artifacts': {}}
+
+    def save(self) -> None:
+        with self._lock:
+            temp_path = self.path.with_name(self.path.name + '.tmp')
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._data, f, indent=2)
+            os.replace(temp_path, self.path)
+
+    def section(self, name) -> dict:
+        """A free-form dict persisted with the cache, for values that are expensive to compute."""
+        with self._lock:
+            return self._data.setdefault(name, {})
+
+    def store(self, section, key, value) -> None:
+        """Set a value of a section and save the cache."""
+        with self._lock:
+            self._data.setdefault(section, {})[key] = value
+            self.save()
+
+    def output_names(self) -> set:
+        """Names of all the files recorded as built, under their current or former name id."""
+        with self._lock:
+            return {name for entry in self._data['artifacts'].values() for name in entry['outputs']}
+
+    def _outputs_owned_by_others(self, artifact, output_names) -> bool:
+        return any(name in entry['outputs']
+                   for other, entry in self._data['artifacts'].items() if other != artifact
+                   for name in output_names)
+
+    def is_fresh(self, artifact, inputs, outputs, params=None, adopt=True) -> bool:
+        """True when the outputs exist and were built from the same inputs and params.
+
+        With adopt, outputs created before the cache existed are kept as they are. Outputs recorded under
+        another name (the song folder was renamed, so its name id changed) are renamed when still up to date.
+        """
+        output_names = [Path(o).name for o in outputs]
+        params = _normalize_params(params)
+        with self._lock:
+            entry = self._data['artifacts'].get(artifact)
+            outputs_exist = all((self.directory / name).exists() for name in output_names)
+
+            if entry is None:
+                if adopt and outputs_exist and not self._outputs_owned_by_others(artifact, output_names):
+                    logger.debug(f"Adopting previously converted {', '.join(output_names)}")
+                    self.record(artifact, inputs, outputs, params)
+                    return True
+                return False
+
+            if entry['params'] != params or len(entry['inputs']) != len(inputs):
+                return False
+            if not all(fingerprint_matches(recorded, i) for recorded, i in zip(entry['inputs'], inputs)):
+                return False
+
+            if outputs_exist and entry['outputs'] == output_names:
+                return True
+            old_paths = [self.directory / name for name in entry['outputs']]
+            if len(old_paths) == len(output_names) and all(p.exists() for p in old_paths):
+                for old_path, name in zip(old_paths, output_names):
+                    if old_path.name != name:
+                        logger.info(f"Reusing {old_path.name} as {name}")
+                        os.replace(old_path, self.directory / name)
+                entry['outputs'] = output_names
+                self.save()
+                return True
+            return False
+
+    def record(self, artifact, inputs, outputs, params=None) -> None:
+        """Remember how an artifact was just built, entries of other artifacts writing the same files are dropped."""
+        output_names = [Path(o).name for o in outputs]
+        entry = {
+            'inputs': [fingerprint(i) for i in inputs],
+            'outputs': output_names,
+            'params': _normalize_params(params),
+        }
+        with self._lock:
+            artifacts = self._data['artifacts']
+            for other in [a for a, e in artifacts.items() if a != artifact and set(e['outputs']) & set(output_names)]:
+                del artifacts[other]
+            artifacts[artifact] = entry
+            self.save()
+
+    def forget(self, artifact) -> None:
+        with self._lock:
+            if self._data['artifacts'].pop(artifact, None) is not None:
+                self.save()
+
+
+def cached_build(cache, artifact, build, inputs, outputs, params=None, adopt=True) -> bool:
+    """Run build() unless the artifact is fresh, returns True when it was (re)built."""
+    inputs = [Path(i) for i in inputs]
+    outputs = [Path(o) for o in outputs]
+    if cache.is_fresh(artifact, inputs, outputs, params, adopt):
+        logger.debug(f"Up to date, skipping: {', '.join(o.name for o in outputs)}")
+        return False
+    # outdated outputs are removed first, ffmpeg would otherwise ask before overwriting them
+    for output in outputs:
+        if output.exists():
+            output.unlink()
+    try:
+        build()
+    except BaseException:
+        # a partial output must never pass for a fresh one
+        cache.forget(artifact)
+        for output in outputs:
+            if output.exists():
+                output.unlink()
+        raise
+    if all(o.exists() for o in outputs):
+        cache.record(artifact, inputs, outputs, params)
+    else:
+        cache.forget(artifact)
+    return True
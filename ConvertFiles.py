@@ -1,21 +1,35 @@
 import csv
 import json
 import logging
+import math
 import os
 import re
 import shutil
 import subprocess
+import tempfile
+import threading
+import time
 import xml.etree.cElementTree as Et
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
 from pathlib import Path
 from xml.dom import minidom
 
 import unicodedata
 
+import CoverImages
+import MediaInfo
 import PitchAnalyzer
 import SupportedFormats
 import UltrastarToSingit
 import data.repository.DlcRepository as repository
+from BuildCache import BuildCache, cached_build
 from ConfigLoader import load_config, load_default_config
+from FfmpegPool import FfmpegPool, HEAVY, LIGHT, ProcessStopped
+from FilePlacement import COPY
+from OutputManifest import MANIFEST_FILE_NAME, OutputManifest
+from RunReport import REPORT_CSV_FILE_NAME, REPORT_JSON_FILE_NAME, RunReport, timed
+from TaskGraph import CpuBudget, TaskGraph
 
 XML_FORMAT = 'xml'
 JSON_FORMAT = 'json'
@@ -31,6 +45,37 @@ NAME_TXT_FILE = 'name.txt'
 
 MUSIC_GENRE_LIST = ['Pop', 'Rap', 'Rock', 'Ballad', 'Electro']
 
+LOUDNORM_FILTER = 'loudnorm=I=-16:LRA=11:TP=-1.5'
+LOUDNESS_TARGET_I = -16.0
+LOUDNESS_TARGET_TP = -1.5
+# songs already this close to the target loudness (in LU) are not normalized at all
+LOUDNESS_TOLERANCE = 1.0
+LOUDNESS_SECTION = 'loudness'
+# still image detection: frames sampled across the video, compared at a tiny grayscale size
+STILL_SAMPLE_COUNT = 8
+STILL_SAMPLE_GAP = 0.5  # seconds between the two frames of a sample, the motion is measured between them
+STILL_SAMPLE_SIZE = (32, 18)
+STILL_MAX_DIFFERENCE = 0.01  # same noise tolerance as freezedetect n=0.01
+MOVING_MIN_DIFFERENCE = 0.05
+STILL_IMAGE_SECTION = 'still_image'
+# version of the still image check, verdicts of an older check are made again
+STILL_IMAGE_CHECK = 3
+# the still video is a loop of this many seconds repeated with stream copy
+STILL_SEGMENT_SECONDS = 10
+TWO_PASS = 'two_pass'
+CRF = 'crf'
+# capped CRF encoding: quality target, VBV peak allowance over the average bitrate budget, size prediction samples
+VIDEO_CRF = 23
+VBV_MAXRATE_FACTOR = 2
+CRF_SAMPLE_COUNT = 3
+CRF_SAMPLE_SECONDS = 4
+# the predicted size must stay this far under the cap, the samples don't see every scene of the video
+CRF_PREDICTION_MARGIN = 0.9
+# visually lossless intermediate 720p video handed to binkc, small enough to sit next to the output
+MEZZANINE_CRF = 16
+MEZZANINE_PRESET = 'veryfast'
+VIDEO_FILTER = 'scale=1280:720:force_original_aspect_ratio=increase,crop=1280:720,fps=25'
+
 # File handler — always active, captures ERROR+ to error.log
 _file_handler = logging.FileHandler('error.log', mode='a')
 _file_handler.setLevel(logging.ERROR)
@@ -45,6 +90,9 @@ _ffprobe_path = 'ffprobe'
 _rad_path = None
 _output_dir = ''
 _input_dir = ''
+_ffmpeg_pool = FfmpegPool()
+_output_manifest = None
+_run_report = RunReport()
 
 
 def _init_paths(cfg) -> None:
@@ -68,6 +116,8 @@ def _init_paths(cfg) -> None:
     _output_dir = str(cfg.folders.output) if cfg.folders.output else os.path.join(os.getcwd(), '_Patch')
     if os.path.isdir(_output_dir):
         for file_or_folder in os.listdir(_output_dir):
+            if file_or_folder in (MANIFEST_FILE_NAME, REPORT_JSON_FILE_NAME, REPORT_CSV_FILE_NAME):
+                continue
             if os.path.isfile(file_or_folder) or not re.search(r'^[0-9A-F]{16}', file_or_folder):
                 # chosen folder contains unknown files or folders, append _Patch subfolder to path and approve
                 _output_dir = os.path.join(_output_dir, "_Patch")
@@ -143,7 +193,8 @@ def find_folders_to_convert():
     input_path = Path(_input_dir)
     dir_to_convert = [x.name for x in input_path.iterdir() if x.is_dir()]
     dir_to_convert = [x for x in dir_to_convert if not x.startswith(('_', '.')) and ' - ' in x]
-    return dir_to_convert
+    # sorted so the generated UIDs and song lists don't depend on the filesystem's listing order
+    return sorted(dir_to_convert)
 
 
 def delete_output_folder():
@@ -158,25 +209,71 @@ def delete_output_folder():
         logger.error(f"Error deleting output folder: {e}")
 
 
-def get_duration(path_to_song):
-    result = subprocess.run(
-        [_ffprobe_path, '-v', 'error', '-show_entries',
-         'format=duration', '-of',
-         'default=noprint_wrappers=1:nokey=1', path_to_song],
-        stdout=subprocess.PIPE,
-        stderr=subprocess.DEVNULL
-    )
-    return float(result.stdout)
+def get_media_info(path) -> MediaInfo.MediaInfo:
+    return MediaInfo.probe(path, _ffprobe_path,
+                           run=lambda cmd: _ffmpeg_pool.run(cmd, LIGHT, ffmpeg=False,
+                                                            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL))
 
 
-def is_video_still_image(file):
-    duration = get_duration(file)
+def get_duration(path_to_song):
+    return get_media_info(path_to_song).duration
+
+
+def sample_video_frames(file, duration, count=STILL_SAMPLE_COUNT):
+    """Grab count pairs of tiny grayscale frames spread across the video, a frame and the one STILL_SAMPLE_GAP
+    later, seeking to each of them in a single ffmpeg call. Returns [] when a frame is missing.
+    """
+    width, height = STILL_SAMPLE_SIZE
+    gap = min(STILL_SAMPLE_GAP, duration / (count + 1) / 2)
+    starts = [duration * (i + 1) / (count + 1) for i in range(count)]
+    timestamps = [t for start in starts for t in (start, start + gap)]
+    cmd = [_ffmpeg_path, '-v', 'error']
+    for timestamp in timestamps:
+        cmd += ['-ss', f'{timestamp:.3f}', '-i', os.fspath(file)]
+    inputs = range(len(timestamps))
+    filter_complex = ';'.join(f'[{i}:v:0]trim=end_frame=1,scale={width}:{height},format=gray,setsar=1[f{i}]'
+                              for i in inputs)
+    filter_complex += ';' + ''.join(f'[f{i}]' for i in inputs) + f'concat=n={len(inputs)}:v=1:a=0[out]'
+    cmd += ['-filter_complex', filter_complex, '-map', '[out]', '-fps_mode', 'passthrough', '-f', 'rawvideo', 'pipe:1']
+    result = _ffmpeg_pool.run(cmd, LIGHT, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    frame_size = width * height
+    data = result.stdout or b''
+    frames = [data[i:i + frame_size] for i in range(0, len(data) - frame_size + 1, frame_size)]
+    if len(frames) != len(timestamps):
+        return []
+    return list(zip(frames[0::2], frames[1::2]))
+
+
+def _frame_difference(a, b) -> float:
+    """Mean absolute pixel difference of two grayscale frames, from 0 (identical) to 1."""
+    return sum(abs(x - y) for x, y in zip(a, b)) / (255 * len(a))
+
+
+def classify_sampled_frames(samples):
+    """True (still), False (moving) or None when the samples aren't conclusive.
+
+    Samples are (frame, frame STILL_SAMPLE_GAP later) pairs. Pictures that change without moving
+    (slideshows, lyric videos) are neither, the freezedetect pass decides those.
+    """
+    if len(samples) < 2:
+        return None
+    motion = [_frame_difference(frame, later) for frame, later in samples]
+    if sum(d > MOVING_MIN_DIFFERENCE for d in motion) >= 2:
+        return False
+    first = samples[0][0]
+    if max(motion) <= STILL_MAX_DIFFERENCE and all(_frame_difference(first, frame) <= STILL_MAX_DIFFERENCE
+                                                   for frame, _ in samples):
+        return True
+    return None
+
+
+def detect_still_image_with_freezedetect(file, duration):
     cmd = [
         _ffmpeg_path, '-i', file,
         '-vf', 'freezedetect=n=0.01:d=0.1',
         '-map', '0:v:0', '-f', 'null', '-'
     ]
-    result = subprocess.run(cmd, stderr=subprocess.PIPE, text=True)
+    result = _ffmpeg_pool.run(cmd, HEAVY, stderr=subprocess.PIPE, text=True)
     stderr = result.stderr
 
     freeze_starts = [float(m.group(1)) for m in re.finditer(r'freeze_start: ([\d.]+)', stderr)]
@@ -191,8 +288,34 @@ def is_video_still_image(file):
     return total_freeze / duration > 0.95
 
 
-def create_still_video_from_cover_image(files_jpg, files_txt, list_in_dir, output_mp4_file_name, song_duration, txt_data):
-    logger.info('creating static video: ' + output_mp4_file_name)
+def is_video_still_image(file):
+    """Whether a video only shows a still picture, the verdict is cached in the song folder's build cache.
+
+    A few frames sampled across the video decide it; the full freezedetect decode only runs when they disagree.
+    """
+    cache = BuildCache.for_dir(Path(file).parent)
+    stat = os.stat(file)
+    entry = cache.section(STILL_IMAGE_SECTION).get(Path(file).name)
+    if (entry and entry.get('size') == stat.st_size and entry.get('mtime_ns') == stat.st_mtime_ns
+            and entry.get('check') == STILL_IMAGE_CHECK):
+        return entry['still']
+
+    media_info = get_media_info(file)
+    if media_info.is_single_image:
+        still = True
+    else:
+        duration = media_info.duration
+        still = classify_sampled_frames(sample_video_frames(file, duration))
+        if still is None:
+            logger.debug(f'Sampled frames of {Path(file).name} are inconclusive, running freezedetect')
+            still = detect_still_image_with_freezedetect(os.fspath(file), duration)
+    cache.store(STILL_IMAGE_SECTION, Path(file).name, {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns,
+                                                         'check': STILL_IMAGE_CHECK, 'still': still})
+    return still
+
+
+def get_cover_file(files_jpg, files_txt, txt_data):
+    """The image named by the #COVER tag if it exists, else the first image of the song folder."""
     file = txt_data.get('COVER', None)
     if file:
         file = os.path.join(os.path.dirname(os.fspath(files_txt[-1])), file)
@@ -200,22 +323,46 @@ def create_still_video_from_cover_image(files_jpg, files_txt, list_in_dir, outpu
             file = files_jpg[0]
     else:
         file = files_jpg[0]
-    target_size_mb = 10
-    target_bitrate_kbps = int((target_size_mb * 8192) / song_duration)
+    return file
+
+
+def render_still_video_frame(cover_file, frame_file):
+    """Composite the 1280x720 still video picture (blurred cover background, cover in the middle) once."""
     complex_filter = (
         "split[bg][fg];"
         "[bg]scale=1280:720:force_original_aspect_ratio=increase,crop=1280:720,gblur=sigma=10[bg_blurred];"
         "[fg]scale='if(gt(iw/ih,1280/720),min(iw,1280),-1)':'if(gt(iw/ih,1280/720),-1,min(ih,720))':force_original_aspect_ratio=decrease[fg_scaled];"
-        "[bg_blurred][fg_scaled]overlay=(W-w)/2:(H-h)/2,fps=25"
+        "[bg_blurred][fg_scaled]overlay=(W-w)/2:(H-h)/2"
     )
-    ffmpeg_cmd = [_ffmpeg_path, '-y', '-loop', '1',
-                 '-i', os.fspath(file), '-c:v', 'libx264', '-t', str(song_duration),
-                 '-preset', 'medium', '-tune', 'stillimage',
-                 '-b:v', f'{target_bitrate_kbps}k',
-                 '-vf', complex_filter,
-                 '-pix_fmt', 'yuv420p',
-                 '-an', os.fspath(list_in_dir / output_mp4_file_name)]
-    subprocess.run(ffmpeg_cmd)
+    ffmpeg_cmd = [_ffmpeg_path, '-y', '-i', os.fspath(cover_file),
+                 '-vf', complex_filter, '-frames:v', '1', '-update', '1',
+                 os.fspath(frame_file)]
+    _ffmpeg_pool.run(ffmpeg_cmd, LIGHT)
+
+
+def create_still_video_from_frame(frame_file, list_in_dir, output_mp4_file_name, song_duration):
+    """Encode a short loop of the still picture and repeat it (stream copy) for the whole song."""
+    logger.info('creating static video: ' + output_mp4_file_name)
+    target_size_mb = 10
+    target_bitrate_kbps = int((target_size_mb * 8192) / song_duration)
+    segment_duration = min(STILL_SEGMENT_SECONDS, song_duration)
+    with tempfile.TemporaryDirectory(prefix='still_video_') as segment_dir:
+        segment_file = os.path.join(segment_dir, 'segment.mp4')
+        ffmpeg_cmd = [_ffmpeg_path, '-y', '-loop', '1', '-framerate', '25',
+                     '-i', os.fspath(frame_file), '-c:v', 'libx264', '-t', str(segment_duration),
+                     '-preset', 'medium', '-tune', 'stillimage',
+                     '-b:v', f'{target_bitrate_kbps}k', '-g', str(int(STILL_SEGMENT_SECONDS * 25)),
+                     '-pix_fmt', 'yuv420p',
+                     '-an', segment_file]
+        _ffmpeg_pool.run(ffmpeg_cmd, HEAVY)
+
+        list_file = os.path.join(segment_dir, 'segments.txt')
+        with open(list_file, 'w', encoding='utf-8') as f:
+            f.write("file 'segment.mp4'\n" * math.ceil(song_duration / segment_duration))
+        ffmpeg_cmd = [_ffmpeg_path, '-y', '-f', 'concat', '-safe', '0', '-i', list_file,
+                     '-c', 'copy', '-t', str(song_duration),
+                     os.fspath(list_in_dir / output_mp4_file_name)]
+        _ffmpeg_pool.run(ffmpeg_cmd, LIGHT)
 
 
 def create_in_game_loading_picture(files_jpg, list_in_dir, png_in_game_file_name):
@@ -223,7 +370,7 @@ def create_in_game_loading_picture(files_jpg, list_in_dir, png_in_game_file_name
     ffmpeg_cmd = [_ffmpeg_path, '-i', os.fspath(file), '-vf',
                  'scale=512:512:force_original_aspect_ratio=increase,crop=512:512',
                  os.fspath(list_in_dir / png_in_game_file_name)]
-    subprocess.run(ffmpeg_cmd)
+    _ffmpeg_pool.run(ffmpeg_cmd, LIGHT)
     logger.info('created : ' + png_in_game_file_name)
 
 
@@ -232,7 +379,7 @@ def create_cover_long(files_jpg, list_in_dir, png_long_file_name):
     ffmpeg_cmd = [_ffmpeg_path, '-i', os.fspath(file), '-vf',
                  'scale=191:396:force_original_aspect_ratio=increase,crop=191:396',
                  os.fspath(list_in_dir / png_long_file_name)]
-    subprocess.run(ffmpeg_cmd)
+    _ffmpeg_pool.run(ffmpeg_cmd, LIGHT)
     logger.info('created : ' + png_long_file_name)
 
 
@@ -241,76 +388,193 @@ def create_cover(files_jpg, list_in_dir, png_file_name):
     ffmpeg_cmd = [_ffmpeg_path, '-i', os.fspath(file), '-vf',
                  'scale=256:256:force_original_aspect_ratio=increase,crop=256:256',
                   os.fspath(list_in_dir / png_file_name)]
-    subprocess.run(ffmpeg_cmd)
+    _ffmpeg_pool.run(ffmpeg_cmd, LIGHT)
     logger.info('created : ' + png_file_name)
 
 
-def create_audio_preview(files_avi, files_mp3, list_in_dir, ogg_preview_file_name, txt_data):
-    if files_mp3:
-        file = files_mp3[0]
-    else:
-        file = files_avi[0]
+def create_cover_images(files_jpg, list_in_dir, png_file_name, png_long_file_name, png_in_game_file_name):
+    """Create the cover, long cover and in-game loading pictures.
+
+    The cover is decoded once in-process with Pillow; ffmpeg is only used when Pillow is missing or can't read it.
+    """
+    outputs = {
+        CoverImages.COVER_SIZE: list_in_dir / png_file_name,
+        CoverImages.COVER_LONG_SIZE: list_in_dir / png_long_file_name,
+        CoverImages.IN_GAME_LOADING_SIZE: list_in_dir / png_in_game_file_name,
+    }
+    try:
+        CoverImages.create_cover_images(files_jpg[0], outputs)
+    except (ImportError, OSError, ValueError) as e:
+        logger.debug(f'Using ffmpeg for the cover pictures ({e})')
+        # ffmpeg would ask before overwriting a picture written before the failure
+        for output in outputs.values():
+            if output.exists():
+                output.unlink()
+        create_cover(files_jpg, list_in_dir, png_file_name)
+        create_cover_long(files_jpg, list_in_dir, png_long_file_name)
+        create_in_game_loading_picture(files_jpg, list_in_dir, png_in_game_file_name)
+
+
+def get_preview_window(txt_data):
+    """Start time and duration (in seconds) of the song preview."""
     preview_start_time = 60
     preview_duration_time = 30
-    if 'MEDLEYSTARTBEAT' in txt_data and 'MEDLEYENDBEAT' in txt_data:
-        preview_start_beat = int(txt_data['MEDLEYSTARTBEAT'])
-        preview_end_beat = int(txt_data['MEDLEYENDBEAT'])
-        bpm = float(txt_data["BPM"].replace(',', '.'))
-        gap = float(txt_data["GAP"].replace(',', '.')) / 1000
-        preview_start_time = (preview_start_beat * 60 / bpm / 4) + gap
-        preview_duration_time = ((preview_end_beat - preview_start_beat) * 60 / bpm / 4)
-    elif 'PREVIEWSTART' in txt_data:
-        preview_start_time = float(txt_data['PREVIEWSTART'].replace(',', '.'))
-    ffmpeg_cmd = [_ffmpeg_path, '-ss', str(preview_start_time), '-i', os.fspath(file),
-                 '-vn',
-                 '-t', str(preview_duration_time), '-ar', '48000',
-                 '-af', 'loudnorm=I=-16:LRA=11:TP=-1.5',
-                 os.fspath(list_in_dir / ogg_preview_file_name)]
-    subprocess.run(ffmpeg_cmd)
-    logger.info('created : ' + ogg_preview_file_name)
-
-
-def create_audio(files_avi, files_mp3, list_in_dir, ogg_file_name, video_gap):
-    if files_mp3:
-        file = files_mp3[0]
-    else:
-        file = files_avi[0]
-    filter_cmd = ''
+    header = txt_data['header']
+    if header.has_medley:
+        preview_start_time = header.beat_to_seconds(header.medley_start_beat) + header.gap
+        preview_duration_time = header.beat_to_seconds(header.medley_end_beat - header.medley_start_beat)
+    elif header.preview_start is not None:
+        preview_start_time = header.preview_start
+    return preview_start_time, preview_duration_time
+
+
+def get_video_gap_filter(video_gap):
     if video_gap < 0:
         # Negative gap: trim the beginning of the audio
         # Remove the first |video_gap| seconds
-        filter_cmd = f'atrim=start={abs(video_gap)},'
-    elif video_gap > 0:
+        return f'atrim=start={abs(video_gap)}'
+    if video_gap > 0:
         # Positive gap: add silence to the beginning
         # Insert video_gap seconds of silence before the audio
-        filter_cmd = f'adelay={int(video_gap * 1000)}|{int(video_gap * 1000)},'
-    filter_cmd += 'loudnorm=I=-16:LRA=11:TP=-1.5'
-    ffmpeg_cmd = [_ffmpeg_path, '-i', os.fspath(file), '-vn', '-ar', '48000',
-                 '-af', filter_cmd,
-                 os.fspath(list_in_dir / ogg_file_name)]
-    subprocess.run(ffmpeg_cmd)
-    logger.info('created : ' + ogg_file_name)
+        return f'adelay={int(video_gap * 1000)}|{int(video_gap * 1000)}'
+    return ''
+
+
+def measure_loudness(file):
+    """Loudness of a source file measured by a loudnorm analysis pass, cached in the song folder's build cache.
+
+    Returns the loudnorm json values (input_i, input_tp, input_lra, input_thresh, target_offset) as strings.
+    """
+    cache = BuildCache.for_dir(Path(file).parent)
+    stat = os.stat(file)
+    entry = cache.section(LOUDNESS_SECTION).get(Path(file).name)
+    if entry and entry.get('size') == stat.st_size and entry.get('mtime_ns') == stat.st_mtime_ns:
+        return entry['measured']
+
+    ffmpeg_cmd = [_ffmpeg_path, '-hide_banner', '-i', os.fspath(file), '-vn',
+                 '-af', LOUDNORM_FILTER + ':print_format=json', '-f', 'null', '-']
+    result = _ffmpeg_pool.run(ffmpeg_cmd, LIGHT, stderr=subprocess.PIPE, text=True)
+    match = re.search(r'\{[^{}]*"input_i"[^{}]*\}', result.stderr or '')
+    if not match:
+        raise RuntimeError(f"Could not measure the loudness of {file}")
+    values = json.loads(match.group(0))
+    measured = {key: values[key] for key in ('input_i', 'input_tp', 'input_lra', 'input_thresh', 'target_offset')}
+    cache.store(LOUDNESS_SECTION, Path(file).name, {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'measured': measured})
+    return measured
+
+
+def get_loudnorm_filter(file):
+    """Linear (second pass) loudnorm filter for a source file, None when its loudness is already within tolerance."""
+    measured = measure_loudness(file)
+    input_i, input_tp = float(measured['input_i']), float(measured['input_tp'])
+    if abs(input_i - LOUDNESS_TARGET_I) <= LOUDNESS_TOLERANCE and input_tp <= LOUDNESS_TARGET_TP:
+        logger.info(f'{Path(file).name} is already at {input_i} LUFS, skipping normalization')
+        return None
+    return (f"{LOUDNORM_FILTER}:measured_I={measured['input_i']}:measured_TP={measured['input_tp']}"
+            f":measured_LRA={measured['input_lra']}:measured_thresh={measured['input_thresh']}"
+            f":offset={measured['target_offset']}:linear=true")
+
+
+def create_audio(files_avi, files_mp3, list_in_dir, ogg_file_name, ogg_preview_file_name, video_gap, txt_data):
+    """Decode the audio once and write both the full track and the preview.
+
+    The preview is cut from the normalized track, so both get the same loudness. Normalization uses the
+    cached loudness measurement of the source, so only this single decode happens once it's measured.
+    """
+    if files_mp3:
+        file = files_mp3[0]
+    else:
+        file = files_avi[0]
+    preview_start_time, preview_duration_time = get_preview_window(txt_data)
+    video_gap_filter = get_video_gap_filter(video_gap)
+    loudnorm_filter = get_loudnorm_filter(file) or 'anull'
+    filter_complex = (f'[0:a]{loudnorm_filter},asplit=2[norm][prev];'
+                      f'[norm]{video_gap_filter or "anull"}[full];'
+                      f'[prev]atrim=start={preview_start_time}:duration={preview_duration_time},asetpts=PTS-STARTPTS[preview]')
+    outputs = [os.fspath(list_in_dir / ogg_file_name), os.fspath(list_in_dir / ogg_preview_file_name)]
+    ffmpeg_cmd = [_ffmpeg_path, '-i', os.fspath(file), '-filter_complex', filter_complex,
+                 '-map', '[full]', '-ar', '48000', outputs[0],
+                 '-map', '[preview]', '-ar', '48000', outputs[1]]
+    _ffmpeg_pool.run(ffmpeg_cmd, LIGHT, outputs=outputs)
+    logger.info('created : ' + ogg_file_name + ', ' + ogg_preview_file_name)
 
 
 def create_video(file, list_in_dir, output_video_file_name, target_bitrate_kbps):
-    # First pass to analyze video
-    ffmpeg_cmd = [_ffmpeg_path, '-y', '-i', os.fspath(file),
-                 '-c:v', 'libx264', '-preset', 'medium', '-b:v', f'{target_bitrate_kbps}k',
-                 '-pass', '1', '-an', '-vf',
-                 'scale=1280:720:force_original_aspect_ratio=increase,crop=1280:720,fps=25',
-                 '-f', 'null', os.devnull]
-    subprocess.run(ffmpeg_cmd)
-    # Second pass to create final file
-    ffmpeg_cmd = [_ffmpeg_path, '-y', '-i', os.fspath(file),
-                 '-c:v', 'libx264', '-preset', 'medium', '-b:v', f'{target_bitrate_kbps}k',
-                 '-pass', '2', '-an', '-vf',
-                 'scale=1280:720:force_original_aspect_ratio=increase,crop=1280:720,fps=25',
-                  os.fspath(list_in_dir / output_video_file_name)]
-    subprocess.run(ffmpeg_cmd)
+    # Each encode gets its own pass log directory, so encodes running in parallel never share their
+    # first pass stats and nothing is left behind in the song folder or the working directory
+    with tempfile.TemporaryDirectory(prefix='ffmpeg2pass_') as passlog_dir:
+        passlog_prefix = os.path.join(passlog_dir, 'ffmpeg2pass')
+        # First pass to analyze video
+        ffmpeg_cmd = [_ffmpeg_path, '-y', '-i', os.fspath(file),
+                     '-c:v', 'libx264', '-preset', 'medium', '-b:v', f'{target_bitrate_kbps}k',
+                     '-pass', '1', '-passlogfile', passlog_prefix, '-an', '-vf',
+                     VIDEO_FILTER,
+                     '-f', 'null', os.devnull]
+        _ffmpeg_pool.run(ffmpeg_cmd, HEAVY, progress_span=(0.0, 0.5))
+        # Second pass to create final file
+        ffmpeg_cmd = [_ffmpeg_path, '-y', '-i', os.fspath(file),
+                     '-c:v', 'libx264', '-preset', 'medium', '-b:v', f'{target_bitrate_kbps}k',
+                     '-pass', '2', '-passlogfile', passlog_prefix, '-an', '-vf',
+                     VIDEO_FILTER,
+                      os.fspath(list_in_dir / output_video_file_name)]
+        _ffmpeg_pool.run(ffmpeg_cmd, HEAVY, progress_span=(0.5, 1.0))
     logger.info('created : ' + output_video_file_name)
-    # Clean up FFmpeg passlog files
-    for log_file in Path('.').glob('ffmpeg2pass*'):
-        os.remove(log_file)
+
+
+def _crf_encode_options(target_bitrate_kbps):
+    maxrate_kbps = target_bitrate_kbps * VBV_MAXRATE_FACTOR
+    return ['-c:v', 'libx264', '-preset', 'medium', '-crf', str(VIDEO_CRF),
+            '-maxrate', f'{maxrate_kbps}k', '-bufsize', f'{maxrate_kbps * 2}k']
+
+
+def predict_crf_video_size(file, duration, target_bitrate_kbps):
+    """Estimate the size (in bytes) of a capped CRF encode from a few short samples, None for short videos."""
+    if duration < CRF_SAMPLE_COUNT * CRF_SAMPLE_SECONDS * 2:
+        return None
+    sample_bytes = 0
+    with tempfile.TemporaryDirectory(prefix='crf_samples_') as sample_dir:
+        for i in range(CRF_SAMPLE_COUNT):
+            start = (duration - CRF_SAMPLE_SECONDS) * (i + 1) / (CRF_SAMPLE_COUNT + 1)
+            sample_file = os.path.join(sample_dir, f'sample{i}.mp4')
+            ffmpeg_cmd = [_ffmpeg_path, '-y', '-ss', f'{start:.3f}', '-i', os.fspath(file),
+                          '-t', str(CRF_SAMPLE_SECONDS)] + _crf_encode_options(target_bitrate_kbps) + [
+                          '-an', '-vf', VIDEO_FILTER, sample_file]
+            _ffmpeg_pool.run(ffmpeg_cmd, HEAVY)
+            if not os.path.exists(sample_file):
+                return None
+            sample_bytes += os.path.getsize(sample_file)
+    return sample_bytes * duration / (CRF_SAMPLE_COUNT * CRF_SAMPLE_SECONDS)
+
+
+def create_video_crf(file, list_in_dir, output_video_file_name, target_bitrate_kbps):
+    """Single pass capped CRF encode, falls back to the two-pass encode when it would exceed the size budget.
+
+    The size budget is what the two-pass encode aims for: target_bitrate_kbps over the whole video.
+    """
+    duration = get_media_info(file).duration
+    max_size_bytes = target_bitrate_kbps * duration * 1024 / 8
+    predicted_size = predict_crf_video_size(file, duration, target_bitrate_kbps)
+    if predicted_size is not None and predicted_size > max_size_bytes * CRF_PREDICTION_MARGIN:
+        logger.info(f'{output_video_file_name}: CRF would reach about {predicted_size / (1024 * 1024):.1f} MB, '
+                    f'using the two-pass encode')
+        return create_video(file, list_in_dir, output_video_file_name, target_bitrate_kbps)
+
+    output_file = list_in_dir / output_video_file_name
+    ffmpeg_cmd = [_ffmpeg_path, '-y', '-i', os.fspath(file)] + _crf_encode_options(target_bitrate_kbps) + [
+                  '-an', '-vf', VIDEO_FILTER, os.fspath(output_file)]
+    _ffmpeg_pool.run(ffmpeg_cmd, HEAVY)
+    if output_file.exists() and output_file.stat().st_size > max_size_bytes:
+        logger.info(f'{output_video_file_name}: CRF encode is over the size budget, using the two-pass encode')
+        output_file.unlink()
+        return create_video(file, list_in_dir, output_video_file_name, target_bitrate_kbps)
+    logger.info('created : ' + output_video_file_name)
+
+
+def encode_video(file, list_in_dir, output_video_file_name, target_bitrate_kbps, encode_mode=TWO_PASS):
+    if encode_mode == CRF:
+        create_video_crf(file, list_in_dir, output_video_file_name, target_bitrate_kbps)
+    else:
+        create_video(file, list_in_dir, output_video_file_name, target_bitrate_kbps)
 
 
 def create_video_bink(file, list_in_dir, output_video_file_name, compression_percentage, quality):
@@ -329,7 +593,42 @@ def create_video_bink(file, list_in_dir, output_video_file_name, compression_per
         bink_args.append(quality_switch)
     bink_args.append('/#')
     logger.info(f"Converting video {file} to {output_video_file_name} with args: {bink_args}")
-    subprocess.run(bink_args, capture_output=True, text=True)
+    _ffmpeg_pool.run(bink_args, HEAVY, ffmpeg=False, capture_output=True, text=True)
+
+
+def get_source_video_size_mb(file):
+    """Size of the video stream of a file from its metadata, the whole file size when the bitrates are unknown."""
+    media_info = get_media_info(file)
+    video_bit_rate = media_info.video_bit_rate
+    if not video_bit_rate and media_info.bit_rate:
+        video_bit_rate = media_info.bit_rate - (media_info.audio_bit_rate or 0)
+    if video_bit_rate and video_bit_rate > 0:
+        return video_bit_rate * media_info.duration / 8 / (1024 * 1024)
+    return Path(file).stat().st_size / (1024 * 1024)
+
+
+def create_video_bink_from_source(file, list_in_dir, output_video_file_name, target_size_mb, quality):
+    """Encode a source video to Bink with a single lossy encode.
+
+    The scaled frames are handed to binkc through a visually lossless mezzanine mp4, written next to the
+    output like the old temporary mp4 (the system temp folder may be too small) and deleted afterwards.
+    The Bink data rate aims at the size of the source video stream, capped by target_size_mb.
+    """
+    mezzanine_file = os.path.join(list_in_dir, Path(output_video_file_name).stem + '_mezzanine.mp4')
+    try:
+        ffmpeg_cmd = [_ffmpeg_path, '-y', '-i', os.fspath(file),
+                      '-c:v', 'libx264', '-preset', MEZZANINE_PRESET, '-crf', str(MEZZANINE_CRF), '-pix_fmt', 'yuv420p',
+                      '-an', '-vf', VIDEO_FILTER, mezzanine_file]
+        # binkc doesn't report its progress, the mezzanine only takes the song half way
+        _ffmpeg_pool.run(ffmpeg_cmd, HEAVY, progress_span=(0.0, 0.5))
+        # binkc's data rate is a percentage of its input's
+        wanted_size_mb = min(get_source_video_size_mb(file), target_size_mb)
+        mezzanine_size_mb = os.path.getsize(mezzanine_file) / (1024 * 1024)
+        compression_percentage = max(1, min(200, int(round(wanted_size_mb / mezzanine_size_mb * 100))))
+        create_video_bink(mezzanine_file, list_in_dir, output_video_file_name, compression_percentage, quality)
+    finally:
+        if os.path.exists(mezzanine_file):
+            os.remove(mezzanine_file)
 
 
 def match_genre(txt_data):
@@ -517,6 +816,13 @@ def get_required_files(name_id: str, output_format: str, song_dir: Path) -> list
     return files
 
 
+def get_generated_file_names(name_id: str) -> set:
+    """Names of every file the converter may write into a song folder, for both output formats."""
+    suffixes = ['.mp4', '.bk2', '_cover.mp4', '_mezzanine.mp4', '_still_frame.png', '.ogg', '_preview.ogg', '.png',
+                '_InGameLoading.png', '_long.png', '_Result.png', '.vxla', '_meta.xml']
+    return {name_id + suffix for suffix in suffixes}
+
+
 def validate_converted_files(required: list) -> list:
     missing = []
     for file_path in required:
@@ -525,191 +831,571 @@ def validate_converted_files(required: list) -> list:
     return missing
 
 
-def convert_files(dirs_to_convert, cfg, stop_event=None, progress_callback=None):
-    dlc_id = str(cfg.dlc.id)
-    core_id = str(cfg.core.id) if cfg.core.id else None
-    output_format = get_output_format(cfg)
-    dlc_json_name = str(cfg.dlc.json_name) if cfg.dlc.json_name else None
-    target_size_mb = float(cfg.conversion_tweaks.max_video_size or 50)
-    pitch_correction_method = str(cfg.conversion_tweaks.pitch_correction or FAST).lower()
-    ignore_medley = bool(cfg.conversion_tweaks.no_medley)
-    ignore_video = bool(cfg.conversion_tweaks.still_video)
-    # Map output_format to UltrastarToSingit OLD/NEW constants
-    vxla_output_type = UltrastarToSingit.JSON if output_format == JSON_FORMAT else UltrastarToSingit.XML
-
-    json_file_name = (dlc_json_name + '.json') if dlc_json_name else None
-    total_song_count = len(dirs_to_convert)
-
-    for song_index, dir_long_name in enumerate(dirs_to_convert):
-        if stop_event and stop_event.is_set():
-            logger.info("Conversion stopped by user.")
-            break
-        try:
-            if ' - ' not in dir_long_name:
-                if progress_callback:
-                    progress_callback(song_index + 1, total_song_count)
-                continue
-
-            name_id = construct_name_id_from_directory_name(dir_long_name)
-            logger.info(name_id)
-
-            list_in_dir = Path(_input_dir) / dir_long_name
-            files_all = [os.fspath(x.name) for x in list_in_dir.iterdir()]
-            files_txt = [x for x in list_in_dir.iterdir() if x.suffix.lower() == SupportedFormats.TXT_EXTENSIONS]
-            files_avi = [x for x in list_in_dir.iterdir() if x.suffix.lower() in SupportedFormats.VIDEO_EXTENSIONS]
-            files_mp3 = [x for x in list_in_dir.iterdir() if x.suffix.lower() in SupportedFormats.AUDIO_EXTENSIONS]
-            files_jpg = [x for x in list_in_dir.iterdir() if x.suffix.lower() in SupportedFormats.IMAGE_EXTENSIONS]
-
-            output_video_file_name = name_id + '.mp4' if output_format == XML_FORMAT else name_id + '.bk2'
-            png_file_name = name_id + '.png'
-            png_in_game_file_name = name_id + '_InGameLoading.png'
-            png_long_file_name = name_id + '_long.png'
-            png_result_file_name = name_id + '_Result.png'
-            vxla_file_name = name_id + '.vxla'
-            ogg_file_name = name_id + '.ogg'
-            ogg_preview_file_name = name_id + '_preview.ogg'
-            xml_file_name = name_id + '_meta.xml'
-
-            # Getting info from the text file
-            if not files_txt:
-                logger.warning('No ultrastar text file found for ' + dir_long_name + ', skipping')
-                continue
+@dataclass
+class ConversionSettings:
+    """Per-run conversion options resolved once from the config."""
+    dlc_id: str
+    core_id: str
+    output_format: str
+    dlc_json_name: str
+    json_file_name: str
+    target_size_mb: float
+    pitch_correction_method: str
+    ignore_medley: bool
+    ignore_video: bool
+    incremental_output: bool
+    placement: str
+    video_encode_mode: str
+    bink_temp_mp4: bool
+    encoding_detector: str
+    vxla_output_type: str
+    cpu_budget: CpuBudget
+    ffmpeg_pool: FfmpegPool
+
+    def heavy_task_cost(self) -> int:
+        """CPU units reserved by video encodes, the threads the ffmpeg pool gives them.
+
+        One unit is always left for the light tasks (audio, covers, vxla), otherwise on small machines
+        an encode takes the whole budget and they queue behind it.
+        """
+        return min(self.ffmpeg_pool.heavy_threads, max(1, self.cpu_budget.units - 1))
+
+    @classmethod
+    def from_config(cls, cfg):
+        output_format = get_output_format(cfg)
+        dlc_json_name = str(cfg.dlc.json_name) if cfg.dlc.json_name else None
+        cpu_budget = CpuBudget(cfg.conversion_tweaks.cpu_budget or None)
+        return cls(
+            dlc_id=str(cfg.dlc.id),
+            core_id=str(cfg.core.id) if cfg.core.id else None,
+            output_format=output_format,
+            dlc_json_name=dlc_json_name,
+            json_file_name=(dlc_json_name + '.json') if dlc_json_name else None,
+            target_size_mb=float(cfg.conversion_tweaks.max_video_size or 50),
+            pitch_correction_method=str(cfg.conversion_tweaks.pitch_correction or FAST).lower(),
+            ignore_medley=bool(cfg.conversion_tweaks.no_medley),
+            ignore_video=bool(cfg.conversion_tweaks.still_video),
+            incremental_output=bool(cfg.conversion_tweaks.incremental_output),
+            placement=str(cfg.conversion_tweaks.placement or COPY).lower(),
+            video_encode_mode=str(cfg.conversion_tweaks.video_encode_mode or TWO_PASS).lower(),
+            bink_temp_mp4=bool(cfg.conversion_tweaks.bink_temp_mp4),
+            encoding_detector=str(cfg.conversion_tweaks.encoding_detector or UltrastarToSingit.AUTO).lower(),
+            # Map output_format to UltrastarToSingit OLD/NEW constants
+            vxla_output_type=UltrastarToSingit.JSON if output_format == JSON_FORMAT else UltrastarToSingit.XML,
+            cpu_budget=cpu_budget,
+            ffmpeg_pool=FfmpegPool(cpu_budget.units, cfg.conversion_tweaks.max_encoders),
+        )
+
+
+@dataclass
+class ConvertedSong:
+    """A song whose assets are converted and placed, waiting to be added to the shared DLC files."""
+    dir_long_name: str
+    name_id: str
+    list_in_dir: Path
+    txt_data: dict
+
+
+def resolve_job_count(cfg) -> int:
+    """Number of songs converted at the same time, 0 or less means one per CPU core."""
+    jobs = cfg.conversion_tweaks.jobs
+    jobs = 1 if jobs is None else int(jobs)
+    if jobs <= 0:
+        jobs = os.cpu_count() or 1
+    return jobs
+
+
+def convert_song(dir_long_name, settings, stop_event=None, on_progress=None):
+    """Convert a single song folder and place its assets into the output folder.
+
+    Returns a ConvertedSong, or None when the song was skipped. Nothing in here touches the
+    files shared by all songs (name.txt, SongsDLC.tsv, songs json), so songs can run in parallel.
+    The assets are converted through a TaskGraph, so the ones not depending on each other
+    (video, audio, covers) run at the same time within the run's CPU budget.
+    on_progress(fraction) is called with the (approximate) progress of the song's encodes.
+    """
+    output_format = settings.output_format
+    ignore_video = settings.ignore_video
+    target_size_mb = settings.target_size_mb
+
+    if ' - ' not in dir_long_name:
+        return None
+
+    name_id = construct_name_id_from_directory_name(dir_long_name)
+    logger.info(name_id)
+
+    list_in_dir = Path(_input_dir) / dir_long_name
+    cache = BuildCache.for_dir(list_in_dir)
+    # converted files are written next to the sources, they must never be picked up as a source themselves
+    generated_file_names = get_generated_file_names(name_id) | cache.output_names()
+    source_files = [x for x in sorted(list_in_dir.iterdir()) if x.name not in generated_file_names]
+    files_txt = [x for x in source_files if x.suffix.lower() == SupportedFormats.TXT_EXTENSIONS]
+    files_avi = [x for x in source_files if x.suffix.lower() in SupportedFormats.VIDEO_EXTENSIONS]
+    files_mp3 = [x for x in source_files if x.suffix.lower() in SupportedFormats.AUDIO_EXTENSIONS]
+    files_jpg = [x for x in source_files if x.suffix.lower() in SupportedFormats.IMAGE_EXTENSIONS]
+
+    output_video_file_name = name_id + '.mp4' if output_format == XML_FORMAT else name_id + '.bk2'
+    png_file_name = name_id + '.png'
+    png_in_game_file_name = name_id + '_InGameLoading.png'
+    png_long_file_name = name_id + '_long.png'
+    png_result_file_name = name_id + '_Result.png'
+    vxla_file_name = name_id + '.vxla'
+    ogg_file_name = name_id + '.ogg'
+    ogg_preview_file_name = name_id + '_preview.ogg'
+
+    # Getting info from the text file
+    if not files_txt:
+        logger.warning('No ultrastar text file found for ' + dir_long_name + ', skipping')
+        return None
+
+    # some songs also have a duet txt file containing '[MULTI]' in its name, alphabetically we want the last one
+    with _run_report.stage(dir_long_name, 'parse', inputs=files_txt[-1:]):
+        txt_data = UltrastarToSingit.parse_file(files_txt[-1])
+    # how many seconds the song is out of sync with the video
+    #  positive - video starts before the song
+    #  negative - video starts after the song
+    video_gap = txt_data['header'].video_gap
+
+    audio_source = files_mp3[0] if files_mp3 else (files_avi[0] if files_avi else None)
+    video_file = list_in_dir / output_video_file_name
+    ogg_file = list_in_dir / ogg_file_name
+    cover_mp4_file = list_in_dir / (name_id + '_cover.mp4')
+    still_frame_file = list_in_dir / (name_id + '_still_frame.png')
+    heavy_cost = settings.heavy_task_cost()
+
+    graph = TaskGraph(settings.cpu_budget, name=name_id)
+    duration_source = audio_source or (files_avi[0] if files_avi else None)
+
+    def report_encode_progress(progress):
+        # the long encodes decide how far the song is, each within its span (e.g. the passes of a two-pass encode)
+        if progress['kind'] == HEAVY and progress['out_time'] is not None:
+            start, end = progress['span']
+            fraction = min(1.0, progress['out_time'] / get_media_info(duration_source).duration)
+            on_progress(start + (end - start) * fraction)
+
+    def with_progress(func):
+        if not on_progress or not duration_source:
+            return func
+
+        def run():
+            with _ffmpeg_pool.progress_listener(report_encode_progress):
+                return func()
+        return run
+
+    def timed_task(stage, func, inputs, outputs):
+        func = with_progress(func)
+
+        def run():
+            with _run_report.stage(dir_long_name, stage, inputs, outputs) as record:
+                result = func()
+                if result is False:
+                    # cached_build found the outputs up to date
+                    record.status = 'cached'
+                return result
+        return run
+
+    def add_cached(artifact, build, inputs, outputs, params=None, cost=1):
+        graph.add(artifact, timed_task(artifact, lambda: cached_build(cache, artifact, build, inputs, outputs, params),
+                                       inputs, outputs),
+                  inputs=inputs, outputs=outputs, cost=cost)
+
+    convert_source_video = bool(files_avi) and not ignore_video
+    if convert_source_video:
+        file = files_avi[0]
+        original_size_mb = file.stat().st_size / (1024 * 1024)
+
+        def video_bitrate_kbps():
+            duration = get_media_info(file).duration
+            if output_format == XML_FORMAT and original_size_mb > target_size_mb:
+                return int((target_size_mb * 8192) / duration)
+            return int((original_size_mb * 8192) / duration)
+
+        if output_format == XML_FORMAT:
+            add_cached('video', lambda: encode_video(file, list_in_dir, output_video_file_name, video_bitrate_kbps(),
+                                                     settings.video_encode_mode),
+                       inputs=[file], outputs=[video_file],
+                       params={'max_video_size': target_size_mb, 'encode_mode': settings.video_encode_mode}, cost=heavy_cost)
+        elif output_format == JSON_FORMAT and file.suffix.lower() in ('.avi', '.divx', '.mp4', '.flv', '.mkv', '.webm'):
+            if not settings.bink_temp_mp4:
+                def video_bink():
+                    quality = 0.1 if is_video_still_image(file) else None
+                    logger.info(str(file))
+                    create_video_bink_from_source(file, list_in_dir, output_video_file_name, target_size_mb, quality)
+
+                add_cached('video_bink', video_bink, inputs=[file], outputs=[video_file],
+                           params={'max_video_size': target_size_mb, 'pipeline': 'mezzanine'}, cost=heavy_cost)
+            else:
+                # the temp mp4 is kept in the song folder, it can be reused as is when encoding the bink again
+                temp_mp4_name = name_id + '.mp4'
+                temp_mp4_file = list_in_dir / temp_mp4_name
+                add_cached('video_mp4', lambda: encode_video(file, list_in_dir, temp_mp4_name, video_bitrate_kbps(),
+                                                             settings.video_encode_mode),
+                           inputs=[file], outputs=[temp_mp4_file], params={'encode_mode': settings.video_encode_mode},
+                           cost=heavy_cost)
+
+                def video_bink():
+                    quality = 0.1 if is_video_still_image(file) else None
+                    logger.info(str(file))
+                    temp_size_mb = temp_mp4_file.stat().st_size / (1024 * 1024)
+                    if temp_size_mb <= target_size_mb:
+                        compression_percentage = 100
+                    else:
+                        percentage = (target_size_mb / temp_size_mb) * 100
+                        compression_percentage = max(1, min(200, int(round(percentage))))
+                    create_video_bink(os.fspath(temp_mp4_file), list_in_dir, output_video_file_name, compression_percentage, quality)
+
+                add_cached('video_bink', video_bink, inputs=[file, temp_mp4_file], outputs=[video_file],
+                           params={'max_video_size': target_size_mb}, cost=heavy_cost)
+
+    if audio_source:
+        add_cached('audio', lambda: create_audio(files_avi, files_mp3, list_in_dir, ogg_file_name, ogg_preview_file_name,
+                                                 video_gap, txt_data),
+                   inputs=[audio_source], outputs=[ogg_file, list_in_dir / ogg_preview_file_name],
+                   params={'video_gap': video_gap, 'window': get_preview_window(txt_data),
+                           'filter': LOUDNORM_FILTER, 'loudnorm': 'linear'})
+
+    if files_jpg:
+        add_cached('covers', lambda: create_cover_images(files_jpg, list_in_dir, png_file_name, png_long_file_name,
+                                                         png_in_game_file_name),
+                   inputs=[files_jpg[0]],
+                   outputs=[list_in_dir / png_file_name, list_in_dir / png_long_file_name, list_in_dir / png_in_game_file_name])
+
+    def still_video_needed():
+        return not (convert_source_video and video_file.exists())
+
+    def still_video():
+        if not still_video_needed():
+            # nothing done, reported like an up to date stage
+            return False
+        # If no video file was present in the song's directory, or if "RAD" Video Tools failed to convert it,
+        # create a still image video from the cover image
+        song_duration = get_duration(os.fspath(ogg_file))
+        cover_file = get_cover_file(files_jpg, files_txt, txt_data)
+        # the cache compares the cover by content hash, the picture is only composited again for a new cover
+        cached_build(cache, 'still_frame', lambda: render_still_video_frame(cover_file, still_frame_file),
+                     inputs=[cover_file], outputs=[still_frame_file])
+        cached_build(cache, 'still_video',
+                     lambda: create_still_video_from_frame(still_frame_file, list_in_dir, cover_mp4_file.name, song_duration),
+                     inputs=[still_frame_file], outputs=[cover_mp4_file],
+                     params={'duration': round(song_duration, 2), 'method': 'loop'})
+
+        if output_format == JSON_FORMAT:
+            cached_build(cache, 'still_video_bink',
+                         lambda: create_video_bink(os.fspath(cover_mp4_file), list_in_dir, output_video_file_name, None, quality=0.1),
+                         inputs=[cover_mp4_file], outputs=[video_file])
+        elif output_format == XML_FORMAT:
+            cached_build(cache, 'still_video_copy', lambda: shutil.copy2(cover_mp4_file, video_file),
+                         inputs=[cover_mp4_file], outputs=[video_file])
+
+    # runs after the video conversion (if any), only does something (and needs the CPU) when there is no converted video
+    graph.add('still_video', timed_task('still_video', still_video, files_jpg[:1], [cover_mp4_file, still_frame_file]),
+              inputs=[ogg_file, video_file] + files_jpg[:1], outputs=[video_file, cover_mp4_file, still_frame_file],
+              cost=lambda: heavy_cost if still_video_needed() else 1)
+
+    def vxla():
+        song_duration = get_duration(os.fspath(ogg_file))
+        vxla_inputs = [files_txt[-1]]
+        if settings.pitch_correction_method == SLOW:
+            # the slow pitch correction analyses the converted audio
+            vxla_inputs.append(ogg_file)
+        # the choruses come from Genius unless the medley tags are used
+        genius_cache_file = UltrastarToSingit.genius_cache_path(files_txt[-1])
+        uses_genius = settings.ignore_medley or not txt_data['header'].has_medley
+        if uses_genius and genius_cache_file.exists():
+            vxla_inputs.append(genius_cache_file)
+        vxla_params = {
+            'duration': round(song_duration, 3),
+            'pitch_correction': settings.pitch_correction_method,
+            'no_medley': settings.ignore_medley,
+            'format': settings.vxla_output_type,
+        }
 
-            # some songs also have a duet txt file containing '[MULTI]' in its name, alphabetically we want the last one
-            txt_data = UltrastarToSingit.parse_file(files_txt[-1])
-            video_gap = 0
-            if 'VIDEOGAP' in txt_data:
-                # how many seconds the song is out of sync with the video
-                #  positive - video starts before the song
-                #  negative - video starts after the song
-                video_gap = float(txt_data['VIDEOGAP'].replace(',', '.'))
-
-            if files_avi and not ignore_video:
-                file = files_avi[0]
-                duration = get_duration(os.fspath(file))
-                original_size_bytes = file.stat().st_size
-                original_size_mb = original_size_bytes / (1024 * 1024)
-                target_bitrate_kbps = int((original_size_mb * 8192) / duration)
-
-                if output_video_file_name not in files_all:
-                    if output_format == XML_FORMAT:
-                        if original_size_mb > target_size_mb:
-                            target_bitrate_kbps = int((target_size_mb * 8192) / duration)
-                        create_video(file, list_in_dir, output_video_file_name, target_bitrate_kbps)
-                    elif output_format == JSON_FORMAT:
-                        if is_video_still_image(file):
-                            quality = 0.1
-                        else:
-                            quality = None
-                        logger.info(str(file))
-                        temp_mp4_name = name_id + '.mp4'
-                        temp_mp4_file = list_in_dir / temp_mp4_name
-                        if file.suffix.lower() in ('.avi', '.divx', '.mp4', '.flv', '.mkv', '.webm'):
-                            if not temp_mp4_file.exists():
-                                create_video(file, list_in_dir, temp_mp4_name, target_bitrate_kbps)
-
-                            temp_size_bytes = temp_mp4_file.stat().st_size
-                            temp_size_mb = temp_size_bytes / (1024 * 1024)
-                            if temp_size_mb <= target_size_mb:
-                                compression_percentage = 100
-                            else:
-                                percentage = (target_size_mb / temp_size_mb) * 100
-                                compression_percentage = max(1, min(200, int(round(percentage))))
-
-                            create_video_bink(os.fspath(temp_mp4_file), list_in_dir, output_video_file_name, compression_percentage, quality)
-
-            if ogg_file_name not in files_all:
-                create_audio(files_avi, files_mp3, list_in_dir, ogg_file_name, video_gap)
-
-            if ogg_preview_file_name not in files_all:
-                create_audio_preview(files_avi, files_mp3, list_in_dir, ogg_preview_file_name, txt_data)
-
-            if files_jpg and png_file_name not in files_all:
-                create_cover(files_jpg, list_in_dir, png_file_name)
-
-            if files_jpg and png_long_file_name not in files_all:
-                create_cover_long(files_jpg, list_in_dir, png_long_file_name)
-
-            if files_jpg and png_in_game_file_name not in files_all:
-                create_in_game_loading_picture(files_jpg, list_in_dir, png_in_game_file_name)
-
-            song_duration = get_duration(os.fspath(list_in_dir / ogg_file_name))
-
-            if not files_avi or ignore_video or not os.path.exists(os.path.join(list_in_dir / output_video_file_name)):
-                # If no video file was present in the song's directory, or if "RAD" Video Tools failed to convert it,
-                # create a still image video from the cover image
-                output_video_file_name_mp4 = name_id + '_cover.mp4'
-                if not os.path.exists(list_in_dir / output_video_file_name_mp4):
-                    create_still_video_from_cover_image(files_jpg, files_txt, list_in_dir, output_video_file_name_mp4, song_duration, txt_data)
-                else:
-                    logger.info(f"Static video already exists, skipping generation: {output_video_file_name_mp4}")
-
-                if output_format == JSON_FORMAT:
-                    if not os.path.exists(list_in_dir / output_video_file_name):
-                        create_video_bink(os.fspath(list_in_dir / output_video_file_name_mp4), list_in_dir, output_video_file_name, None, quality=0.1)
-                elif output_format == XML_FORMAT:
-                    if ignore_video or not os.path.exists(list_in_dir / output_video_file_name):
-                        shutil.copy2(list_in_dir / output_video_file_name_mp4, list_in_dir / output_video_file_name)
-
-            # generating vxla file
-            if pitch_correction_method == SLOW:
-                pitch_corr = PitchAnalyzer.get_pitch_correction_suggestion_slow(txt_data, os.fspath(list_in_dir / ogg_file_name),
-                                                                                min_pitch=PITCH_MIN, max_pitch=PITCH_MAX)
+        def build():
+            if settings.pitch_correction_method == SLOW:
+                with timed('pitch_correction'):
+                    pitch_corr = PitchAnalyzer.get_pitch_correction_suggestion_slow(txt_data, os.fspath(ogg_file),
+                                                                                    min_pitch=PITCH_MIN, max_pitch=PITCH_MAX)
             else:
                 pitch_corr = PitchAnalyzer.get_pitch_correction_suggestion_fast(txt_data, min_pitch=PITCH_MIN, max_pitch=PITCH_MAX)
-            UltrastarToSingit.main(files_txt[-1], song_duration, pitch_corr, s=name_id, directory=list_in_dir, output_type=vxla_output_type, ignore_medley=ignore_medley)
-
-            # Validate that all required converted files were created successfully
-            required = get_required_files(name_id, output_format, list_in_dir)
-            missing = validate_converted_files(required)
-            if missing:
-                logger.error(f"Skipping '{dir_long_name}': missing converted files: {', '.join(missing)}")
-                if progress_callback:
-                    progress_callback(song_index + 1, total_song_count)
-                continue
+            UltrastarToSingit.main(files_txt[-1], song_duration, pitch_corr, s=name_id, directory=list_in_dir,
+                                   output_type=settings.vxla_output_type, ignore_medley=settings.ignore_medley)
+
+        # vxla files written by older versions are always regenerated
+        vxla_outputs = [list_in_dir / vxla_file_name]
+        built = cached_build(cache, 'vxla', build, inputs=vxla_inputs, outputs=vxla_outputs, params=vxla_params,
+                             adopt=False)
+        if built and uses_genius:
+            if not genius_cache_file.exists():
+                # Genius couldn't be reached and the choruses were guessed, the lookup is tried again next run
+                cache.forget('vxla')
+            elif genius_cache_file not in vxla_inputs:
+                # the build fetched the choruses, the vxla now depends on them
+                cache.record('vxla', vxla_inputs + [genius_cache_file], vxla_outputs, vxla_params)
+        return built
+
+    # generating vxla file
+    graph.add('vxla', timed_task('vxla', vxla, files_txt[-1:], [list_in_dir / vxla_file_name]), inputs=[files_txt[-1], ogg_file], outputs=[list_in_dir / vxla_file_name])
 
-            # Handle name.txt
-            add_data_to_name_txt(dlc_id, name_id, output_format, dlc_json_name, cfg)
+    try:
+        graph.run(stop_event)
+    except ProcessStopped:
+        return None
+    if stop_event and stop_event.is_set():
+        return None
+
+    # Validate that all required converted files were created successfully
+    required = get_required_files(name_id, output_format, list_in_dir)
+    missing = validate_converted_files(required)
+    if missing:
+        logger.error(f"Skipping '{dir_long_name}': missing converted files: {', '.join(missing)}")
+        return None
+
+    # creating the folder structure if not already present
+    base_dlc_dir = os.path.join(_output_dir, settings.dlc_id)
+    os.makedirs(os.path.join(base_dlc_dir, 'romfs/Songs/audio'), exist_ok=True)
+    os.makedirs(os.path.join(base_dlc_dir, 'romfs/Songs/audio_preview'), exist_ok=True)
+    os.makedirs(os.path.join(base_dlc_dir, 'romfs/Songs/covers'), exist_ok=True)
+    os.makedirs(os.path.join(base_dlc_dir, 'romfs/Songs/videos'), exist_ok=True)
+    os.makedirs(os.path.join(base_dlc_dir, 'romfs/Songs/vxla'), exist_ok=True)
+
+    # placing all files into the correct folders, as (source file name, destination folder, destination file name)
+    placements = [
+        (ogg_file_name, 'romfs/Songs/audio', None),
+        (ogg_preview_file_name, 'romfs/Songs/audio_preview', None),
+        (png_file_name, 'romfs/Songs/covers', None),
+        (vxla_file_name, 'romfs/Songs/vxla', None),
+        (output_video_file_name, 'romfs/Songs/videos', None),
+    ]
+    if output_format == XML_FORMAT:
+        os.makedirs(os.path.join(base_dlc_dir, 'romfs/Songs/backgrounds/InGameLoading'), exist_ok=True)
+        os.makedirs(os.path.join(base_dlc_dir, 'romfs/Songs/backgrounds/Result'), exist_ok=True)
+        os.makedirs(os.path.join(base_dlc_dir, 'romfs/Songs/covers_duet'), exist_ok=True)
+        os.makedirs(os.path.join(base_dlc_dir, 'romfs/Songs/covers_long'), exist_ok=True)
+
+        placements += [
+            (png_in_game_file_name, 'romfs/Songs/backgrounds/InGameLoading', None),
+            (png_in_game_file_name, 'romfs/Songs/backgrounds/Result', png_result_file_name),
+            (png_long_file_name, 'romfs/Songs/covers_long', None),
+        ]
+
+    sources = [list_in_dir / source_name for source_name, _, _ in placements]
+    destinations = [Path(base_dlc_dir, folder, file_name or source_name) for source_name, folder, file_name in placements]
+    with _run_report.stage(dir_long_name, 'place', sources, destinations):
+        for source, (_, folder, file_name) in zip(sources, placements):
+            place_file(name_id, source, os.path.join(base_dlc_dir, folder), settings, file_name=file_name)
+
+    _output_manifest.set_song(name_id, dir_long_name, txt_data)
+    return ConvertedSong(dir_long_name, name_id, list_in_dir, txt_data)
+
+
+def meta_xml_file_name(name_id):
+    return name_id + '_meta.xml'
+
+
+def register_song(song, settings, cfg):
+    """Add a converted song to the files shared by all songs, must be called in song order."""
+    xml_file_name = meta_xml_file_name(song.name_id)
+
+    # Handle name.txt
+    add_data_to_name_txt(settings.dlc_id, song.name_id, settings.output_format, settings.dlc_json_name, cfg)
+
+    # Handle SongsDLC.tsv for XML format, or json file for JSON format
+    handle_xml_or_json(settings.dlc_id, settings.core_id, settings.json_file_name, song.list_in_dir, song.txt_data,
+                       song.name_id, settings.output_format, xml_file_name, cfg)
+
+    if settings.output_format == XML_FORMAT:
+        place_file(song.name_id, song.list_in_dir / xml_file_name, os.path.join(_output_dir, settings.dlc_id, 'romfs'), settings)
+
+
+def place_file(name_id, source, destination_dir, settings, file_name=None):
+    """Put a converted file into the output folder and record it in the output manifest.
+
+    In incremental mode the copy is skipped when the file placed by a previous run is still up to date.
+    """
+    destination = Path(destination_dir) / (file_name or Path(source).name)
+    _output_manifest.place(name_id, source, destination, incremental=settings.incremental_output,
+                           placement=settings.placement)
+
+
+def delete_song_index_files(settings):
+    """Remove name.txt, SongsDLC.tsv and the songs json so they can be written again from scratch."""
+    dlc_romfs_dir = os.path.join(_output_dir, settings.dlc_id, 'romfs')
+    index_files = [os.path.join(dlc_romfs_dir, NAME_TXT_FILE)]
+    if settings.json_file_name:
+        index_files.append(os.path.join(dlc_romfs_dir, settings.json_file_name))
+    if settings.core_id:
+        index_files.append(os.path.join(_output_dir, settings.core_id, 'romfs/Data/StreamingAssets', SONG_DLC_FILE))
+    for index_file in index_files:
+        if os.path.exists(index_file):
+            os.remove(index_file)
+
+
+def update_incremental_output(dirs_to_convert, converted, stopped, settings, cfg):
+    """Reconcile the output folder with the manifest after an incremental run.
+
+    Songs whose folder is gone (or, unless the run was stopped, failed to convert) are removed.
+    The files shared by all songs are then regenerated from the manifest in song order.
+    """
+    input_dirs = set(dirs_to_convert)
+    for name_id, song in list(_output_manifest.songs.items()):
+        if song['dir'] not in input_dirs:
+            _output_manifest.remove_song(name_id)
+        elif not stopped and song['dir'] not in converted:
+            _output_manifest.remove_song(name_id)
+
+    delete_song_index_files(settings)
+    for dir_long_name in dirs_to_convert:
+        name_id = _output_manifest.name_id_for_dir(dir_long_name)
+        if not name_id:
+            continue
+        song = converted.get(dir_long_name) or ConvertedSong(dir_long_name, name_id, Path(_input_dir) / dir_long_name,
+                                                             dict(_output_manifest.songs[name_id]['tags']))
+        _register_song_safely(song, settings, cfg)
 
-            # Handle SongsDLC.tsv for XML format, or json file for JSON format
-            handle_xml_or_json(dlc_id, core_id, json_file_name, list_in_dir, txt_data,
-                               name_id, output_format, xml_file_name, cfg)
 
-            # creating the folder structure if not already present
-            base_dlc_dir = os.path.join(_output_dir, dlc_id)
-            os.makedirs(os.path.join(base_dlc_dir, 'romfs/Songs/audio'), exist_ok=True)
-            os.makedirs(os.path.join(base_dlc_dir, 'romfs/Songs/audio_preview'), exist_ok=True)
-            os.makedirs(os.path.join(base_dlc_dir, 'romfs/Songs/covers'), exist_ok=True)
-            os.makedirs(os.path.join(base_dlc_dir, 'romfs/Songs/videos'), exist_ok=True)
-            os.makedirs(os.path.join(base_dlc_dir, 'romfs/Songs/vxla'), exist_ok=True)
+def _convert_song_safely(dir_long_name, settings, stop_event=None, progress=None):
+    if stop_event and stop_event.is_set():
+        return None
+    on_progress = (lambda fraction: progress.song_progress(dir_long_name, fraction)) if progress else None
+    try:
+        with _run_report.song(dir_long_name):
+            return convert_song(dir_long_name, settings, stop_event, on_progress)
+    except Exception as e:
+        logger.exception(f"Error with directory {dir_long_name}")
+        logger.error(f"Error with directory {dir_long_name}: {e}")
+        return None
 
-            # placing all files into the correct folders
-            shutil.copy2(os.fspath(list_in_dir / ogg_file_name), os.path.join(base_dlc_dir, 'romfs/Songs/audio'))
-            shutil.copy2(os.fspath(list_in_dir / ogg_preview_file_name), os.path.join(base_dlc_dir, 'romfs/Songs/audio_preview'))
-            shutil.copy2(os.fspath(list_in_dir / png_file_name), os.path.join(base_dlc_dir, 'romfs/Songs/covers'))
-            shutil.copy2(os.fspath(list_in_dir / vxla_file_name), os.path.join(base_dlc_dir, 'romfs/Songs/vxla'))
-            shutil.copy2(os.fspath(list_in_dir / output_video_file_name), os.path.join(base_dlc_dir, 'romfs/Songs/videos'))
 
-            if output_format == XML_FORMAT:
-                os.makedirs(os.path.join(base_dlc_dir, 'romfs/Songs/backgrounds/InGameLoading'), exist_ok=True)
-                os.makedirs(os.path.join(base_dlc_dir, 'romfs/Songs/backgrounds/Result'), exist_ok=True)
-                os.makedirs(os.path.join(base_dlc_dir, 'romfs/Songs/covers_duet'), exist_ok=True)
-                os.makedirs(os.path.join(base_dlc_dir, 'romfs/Songs/covers_long'), exist_ok=True)
-
-                shutil.copy2(os.fspath(list_in_dir / png_in_game_file_name), os.path.join(base_dlc_dir, 'romfs/Songs/backgrounds/InGameLoading'))
-                shutil.copy2(os.fspath(list_in_dir / png_in_game_file_name), os.path.join(base_dlc_dir, 'romfs/Songs/backgrounds/Result', png_result_file_name))
-                shutil.copy2(os.fspath(list_in_dir / png_long_file_name), os.path.join(base_dlc_dir, 'romfs/Songs/covers_long'))
-                shutil.copy2(os.fspath(list_in_dir / xml_file_name), os.path.join(base_dlc_dir, 'romfs'))
-
-            if progress_callback:
-                progress_callback(song_index + 1, total_song_count)
-
-        except Exception as e:
-            logger.exception(f"Error with directory {dir_long_name}")
-            logger.error(f"Error with directory {dir_long_name}: {e}")
-            if progress_callback:
-                progress_callback(song_index + 1, total_song_count)
-            continue
+def _register_song_safely(song, settings, cfg):
+    # the shared files grow with every song, only the meta xml placed for the song counts as its I/O
+    placed = []
+    if settings.output_format == XML_FORMAT:
+        xml_file_name = meta_xml_file_name(song.name_id)
+        placed = [song.list_in_dir / xml_file_name, Path(_output_dir, settings.dlc_id, 'romfs', xml_file_name)]
+    try:
+        with _run_report.stage(song.dir_long_name, 'register', placed[:1], placed[1:]):
+            register_song(song, settings, cfg)
+    except Exception as e:
+        logger.exception(f"Error with directory {song.dir_long_name}")
+        logger.error(f"Error with directory {song.dir_long_name}: {e}")
+
+
+class ConversionProgress:
+    """Reports the progress of a run: songs done, plus how far the songs being converted are.
+
+    progress_callback(current, total) is called when a song is done. While songs are encoding it is
+    called as progress_callback(current, total, fraction), fraction being the overall progress from 0 to 1.
+    """
+
+    # minimum time between two reports of the songs being converted (seconds)
+    REPORT_INTERVAL = 0.5
+
+    def __init__(self, total_song_count, progress_callback):
+        self.total_song_count = total_song_count
+        self.progress_callback = progress_callback
+        self.finished_count = 0
+        self._in_progress = {}
+        self._last_report = 0.0
+        self._lock = threading.Lock()
+
+    def song_progress(self, dir_long_name, fraction):
+        with self._lock:
+            self._in_progress[dir_long_name] = max(fraction, self._in_progress.get(dir_long_name, 0.0))
+            now = time.monotonic()
+            if now - self._last_report < self.REPORT_INTERVAL:
+                return
+            self._last_report = now
+            overall = (self.finished_count + sum(self._in_progress.values())) / max(1, self.total_song_count)
+            current = self.finished_count
+        self.progress_callback(current, self.total_song_count, min(1.0, overall))
+
+    def song_finished(self, dir_long_name):
+        with self._lock:
+            self._in_progress.pop(dir_long_name, None)
+            self.finished_count += 1
+            current = self.finished_count
+        self.progress_callback(current, self.total_song_count)
+
+
+def convert_files(dirs_to_convert, cfg, stop_event=None, progress_callback=None, settings=None):
+    """Convert the song folders and register them in the output, see ConversionProgress for progress_callback.
+
+    settings are made from cfg when not given, they own the CPU budget and the ffmpeg pool of the run.
+    """
+    global _ffmpeg_pool, _output_manifest, _run_report
+    settings = settings or ConversionSettings.from_config(cfg)
+    _run_report = RunReport()
+    # the song folders may have changed since the last run (GUI), their caches are read again
+    BuildCache.reset()
+    try:
+        UltrastarToSingit.set_encoding_detector(settings.encoding_detector)
+    except ValueError as e:
+        logger.warning(f"{e}, using {UltrastarToSingit.AUTO}")
+        UltrastarToSingit.set_encoding_detector(UltrastarToSingit.AUTO)
+    _ffmpeg_pool = settings.ffmpeg_pool
+    # a stop request terminates the running encoders instead of waiting for them
+    _ffmpeg_pool.stop_event = stop_event
+    progress = ConversionProgress(len(dirs_to_convert), progress_callback) if progress_callback else None
+    _output_manifest = OutputManifest(_output_dir)
+    total_song_count = len(dirs_to_convert)
+    jobs = min(resolve_job_count(cfg), max(1, total_song_count))
+    converted = {}
+
+    def on_song_converted(song):
+        converted[song.dir_long_name] = song
+        # in incremental mode the shared files are regenerated from the manifest once all songs are done
+        if not settings.incremental_output:
+            _register_song_safely(song, settings, cfg)
+
+    if jobs <= 1:
+        for dir_long_name in dirs_to_convert:
+            if stop_event and stop_event.is_set():
+                logger.info("Conversion stopped by user.")
+                break
+            song = _convert_song_safely(dir_long_name, settings, stop_event, progress)
+            if song:
+                on_song_converted(song)
+            if progress:
+                progress.song_finished(dir_long_name)
+    else:
+        logger.info(f"Converting up to {jobs} songs in parallel")
+        with ThreadPoolExecutor(max_workers=jobs, thread_name_prefix='song') as executor:
+            futures = [executor.submit(_convert_song_safely, dir_long_name, settings, stop_event, progress)
+                       for dir_long_name in dirs_to_convert]
+            future_dirs = dict(zip(futures, dirs_to_convert))
+            next_to_register = 0
+            stopped = False
+            for future in as_completed(futures):
+                if not future.cancelled() and progress:
+                    progress.song_finished(future_dirs[future])
+                if stop_event and stop_event.is_set() and not stopped:
+                    logger.info("Conversion stopped by user.")
+                    stopped = True
+                    for pending in futures:
+                        pending.cancel()
+                # songs are added to the shared files in input order, no matter which one finished first
+                while next_to_register < len(futures) and futures[next_to_register].done():
+                    done = futures[next_to_register]
+                    next_to_register += 1
+                    song = None if done.cancelled() else done.result()
+                    if song:
+                        on_song_converted(song)
+
+    if settings.incremental_output:
+        update_incremental_output(dirs_to_convert, converted, bool(stop_event and stop_event.is_set()), settings, cfg)
+    _output_manifest.remove_stale_files()
+    _output_manifest.save()
+    write_run_report(cfg)
+
+
+def write_run_report(cfg):
+    """Log the slowest songs and stages of the run, and save all the timings next to the output when enabled."""
+    _run_report.finish()
+    for line in _run_report.summary_lines():
+        logger.info(line)
+    if bool(cfg.conversion_tweaks.run_report):
+        _run_report.write(_output_dir)
+        logger.info(f'Run report written to {os.path.join(_output_dir, REPORT_JSON_FILE_NAME)} and {REPORT_CSV_FILE_NAME}')
 
 
 def main(cfg=None, stop_event=None, progress_callback=None):
@@ -728,7 +1414,10 @@ def main(cfg=None, stop_event=None, progress_callback=None):
     ignore_medley = bool(cfg.conversion_tweaks.no_medley)
     ignore_video = bool(cfg.conversion_tweaks.still_video)
 
-    delete_output_folder()
+    if bool(cfg.conversion_tweaks.incremental_output):
+        logger.info('MODE: Incremental output (only changed files are copied to the output folder)')
+    else:
+        delete_output_folder()
     rename_folders_physically()
     dirs_to_convert = find_folders_to_convert()
 
@@ -738,4 +1427,11 @@ def main(cfg=None, stop_event=None, progress_callback=None):
         logger.info('MODE: Ignoring Medley tags (forcing Genius/Auto detection)')
     if ignore_video:
         logger.info('MODE: Ignoring original video (forcing still image video)')
-    convert_files(dirs_to_convert, cfg, stop_event=stop_event, progress_callback=progress_callback)
+    settings = ConversionSettings.from_config(cfg)
+    if settings.video_encode_mode == CRF:
+        logger.info('MODE: Single pass capped CRF video encoding (two-pass when the size budget would be exceeded)')
+    if settings.placement != COPY:
+        logger.info(f'Output files placement: {settings.placement}')
+    logger.info(f'Parallel song conversions: {resolve_job_count(cfg)}, CPU budget: {settings.cpu_budget.units} cores, '
+                f'encoders: {settings.ffmpeg_pool.max_encoders} x {settings.ffmpeg_pool.heavy_threads} threads')
+    convert_files(dirs_to_convert, cfg, stop_event=stop_event, progress_callback=progress_callback, settings=settings)
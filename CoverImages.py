@@ -0,0 +1,38 @@
+import logging
+import os
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = ImageOps = None
+
+logger = logging.getLogger(__name__)
+
+COVER_SIZE = (256, 256)
+COVER_LONG_SIZE = (191, 396)
+IN_GAME_LOADING_SIZE = (512, 512)
+
+
+def pillow_available() -> bool:
+    return Image is not None
+
+
+def _fit(image, size):
+    # same as ffmpeg scale=W:H:force_original_aspect_ratio=increase,crop=W:H (centered crop)
+    return ImageOps.fit(image, size, method=Image.BICUBIC, centering=(0.5, 0.5))
+
+
+def create_cover_images(source, outputs) -> None:
+    """Decode the cover once and write every crop of it, outputs maps a (width, height) size to a png path.
+
+    Raises ImportError when Pillow isn't installed and OSError when it can't read the image,
+    the caller falls back to ffmpeg then.
+    """
+    if not pillow_available():
+        raise ImportError('Pillow is not installed')
+    with Image.open(os.fspath(source)) as image:
+        has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+    for size, output in outputs.items():
+        _fit(image, size).save(os.fspath(output), format='PNG')
+        logger.info('created : ' + os.path.basename(os.fspath(output)))
@@ -0,0 +1,179 @@
+import logging
+import os
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+
+import RunReport
+
+logger = logging.getLogger(__name__)
+
+HEAVY = 'heavy'  # video encodes, full video decodes, binkc
+LIGHT = 'light'  # image scaling, audio encodes, ffprobe
+
+# x264 doesn't get much faster past this many threads at 720p, more encoders in parallel scale better
+THREADS_PER_ENCODER = 4
+
+# how often a running process is checked for a stop request (seconds)
+POLL_INTERVAL = 0.25
+# time given to a process to exit after being asked to terminate, before it is killed
+TERMINATE_TIMEOUT = 5
+
+
+class ProcessStopped(Exception):
+    """Raised by FfmpegPool.run when its process was terminated because the conversion was stopped."""
+
+
+def parse_progress_block(block) -> dict:
+    """Convert an ffmpeg -progress key=value block to out_time (seconds), fps and speed."""
+    out_time_us = block.get('out_time_us') or block.get('out_time_ms')  # both are microseconds
+    try:
+        out_time = max(0.0, int(out_time_us) / 1_000_000)
+    except (TypeError, ValueError):
+        out_time = None
+    try:
+        fps = float(block.get('fps'))
+    except (TypeError, ValueError):
+        fps = None
+    try:
+        speed = float(block.get('speed', '').rstrip('x'))
+    except ValueError:
+        speed = None
+    return {'out_time': out_time, 'fps': fps, 'speed': speed, 'end': block.get('progress') == 'end'}
+
+
+class FfmpegPool:
+    """Runs external media tools with a thread budget so parallel jobs don't oversubscribe the CPU.
+
+    Heavy jobs are limited to max_encoders at a time and share the cores between them, light jobs
+    get a single thread each and are queued separately so they never wait behind a long encode.
+    Once stop_event is set, running processes are terminated and queued ones never start.
+    """
+
+    def __init__(self, cpu_count=None, max_encoders=None, stop_event=None):
+        self.cpu_count = max(1, int(cpu_count or os.cpu_count() or 1))
+        self.max_encoders = min(self.cpu_count, max(1, int(max_encoders or self.cpu_count // THREADS_PER_ENCODER)))
+        self.heavy_threads = max(1, self.cpu_count // self.max_encoders)
+        self.light_threads = 1
+        self.stop_event = stop_event
+        self._slots = {
+            HEAVY: threading.BoundedSemaphore(self.max_encoders),
+            LIGHT: threading.BoundedSemaphore(self.cpu_count),
+        }
+        self._local = threading.local()
+
+    def threads_for(self, kind) -> int:
+        return self.heavy_threads if kind == HEAVY else self.light_threads
+
+    @staticmethod
+    def with_threads(cmd, threads, outputs=None) -> list:
+        """Insert the thread options into an ffmpeg command line.
+
+        -threads applies to the output following it, so it goes before each of the outputs (the last
+        argument when not given).
+        """
+        cmd = [os.fspath(arg) for arg in cmd]
+        outputs = {os.fspath(output) for output in outputs} if outputs else {cmd[-1]}
+        threaded = [cmd[0], '-filter_threads', str(threads)]
+        for i, arg in enumerate(cmd[1:], 1):
+            if arg in outputs and cmd[i - 1] != '-i':
+                threaded += ['-threads', str(threads)]
+            threaded.append(arg)
+        return threaded
+
+    @contextmanager
+    def progress_listener(self, listener):
+        """Send the progress of the ffmpeg commands run by this thread to listener(progress).
+
+        progress is a dict with out_time (seconds), fps, speed, end, the kind of the command and its
+        progress span: the (start, end) part of the work it stands for, (0.0, 1.0) unless given to run().
+        """
+        previous = getattr(self._local, 'listener', None)
+        self._local.listener = listener
+        try:
+            yield
+        finally:
+            self._local.listener = previous
+
+    def _stopped(self) -> bool:
+        return self.stop_event is not None and self.stop_event.is_set()
+
+    def run(self, cmd, kind=LIGHT, ffmpeg=True, outputs=None, progress_span=None,
+            **kwargs) -> subprocess.CompletedProcess:
+        """Run a command like subprocess.run once a slot of the given kind is free.
+
+        With ffmpeg=True the command gets a -threads budget for each of its outputs (the last argument
+        unless given), other tools (ffprobe, binkc) only queue.
+        When the caller doesn't capture the output and a progress listener is set, ffmpeg reports its
+        progress through -progress pipe:1.
+        """
+        listener = getattr(self._local, 'listener', None)
+        stream_progress = (ffmpeg and listener is not None
+                           and not {'stdout', 'stderr', 'capture_output'} & kwargs.keys())
+        if ffmpeg:
+            cmd = self.with_threads(cmd, self.threads_for(kind), outputs)
+        if stream_progress:
+            cmd = [cmd[0], '-progress', 'pipe:1', '-nostats'] + cmd[1:]
+        with self._slots[kind]:
+            if self._stopped():
+                raise ProcessStopped(f"{os.path.basename(cmd[0])} not started, conversion stopped")
+            if stream_progress:
+                span = progress_span or (0.0, 1.0)
+                return self._run_process(cmd, lambda progress: listener(dict(progress, kind=kind, span=span)),
+                                         **kwargs)
+            return self._run_process(cmd, None, **kwargs)
+
+    def _run_process(self, cmd, listener, check=False, capture_output=False, **kwargs) -> subprocess.CompletedProcess:
+        if capture_output:
+            kwargs['stdout'] = kwargs['stderr'] = subprocess.PIPE
+        if listener:
+            kwargs.update(stdout=subprocess.PIPE, text=True)
+        stdout = stderr = None
+        start = time.perf_counter()
+        with subprocess.Popen(cmd, **kwargs) as process:
+            reader = None
+            if listener:
+                reader = threading.Thread(target=self._read_progress, args=(process.stdout, listener), daemon=True)
+                reader.start()
+            while True:
+                try:
+                    if listener:
+                        process.wait(timeout=POLL_INTERVAL)
+                    else:
+                        stdout, stderr = process.communicate(timeout=POLL_INTERVAL)
+                    break
+                except subprocess.TimeoutExpired:
+                    if self._stopped():
+                        self._terminate(process)
+                        raise ProcessStopped(f"{os.path.basename(cmd[0])} terminated, conversion stopped")
+            if reader:
+                reader.join()
+                stdout = None
+        RunReport.record_subprocess(process.returncode, time.perf_counter() - start)
+        result = subprocess.CompletedProcess(cmd, process.returncode, stdout, stderr)
+        if check:
+            result.check_returncode()
+        return result
+
+    @staticmethod
+    def _terminate(process) -> None:
+        process.terminate()
+        try:
+            process.wait(timeout=TERMINATE_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+    @staticmethod
+    def _read_progress(stream, listener) -> None:
+        block = {}
+        for line in stream:
+            key, _, value = line.strip().partition('=')
+            block[key] = value
+            if key == 'progress':
+                try:
+                    listener(parse_progress_block(block))
+                except Exception as e:
+                    logger.debug(f"Progress listener failed: {e}")
+                block = {}
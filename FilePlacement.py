@@ -0,0 +1,70 @@
+import errno
+import logging
+import os
+import shutil
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+COPY = 'copy'
+HARDLINK = 'hardlink'
+REFLINK = 'reflink'
+SYMLINK = 'symlink'
+PLACEMENTS = (COPY, HARDLINK, REFLINK, SYMLINK)
+
+# linux/fs.h, clones the extents of a file on copy-on-write filesystems (btrfs, xfs, bcachefs...)
+_FICLONE = 0x40049409
+
+_warned = set()
+_warned_lock = threading.Lock()
+
+
+def _reflink(source, destination) -> None:
+    if fcntl is None or not hasattr(fcntl, 'ioctl'):
+        raise OSError(errno.ENOTSUP, 'reflinks are not supported on this platform')
+    with open(source, 'rb') as src, open(destination, 'wb') as dst:
+        try:
+            fcntl.ioctl(dst.fileno(), _FICLONE, src.fileno())
+        except OSError:
+            dst.close()
+            os.remove(destination)
+            raise
+    shutil.copystat(source, destination)
+
+
+def _warn_fallback(placement, error) -> None:
+    with _warned_lock:
+        if placement in _warned:
+            return
+        _warned.add(placement)
+    logger.warning(f"Cannot {placement} into the output folder ({error}), copying files instead")
+
+
+def place_file(source, destination, placement=COPY) -> str:
+    """Put source at destination with the given placement, returns the placement actually used.
+
+    Hardlinks and reflinks don't use extra disk space, symlinks are only meant for staging as they
+    break when the song folder is cleaned up. When the filesystem can't do it the file is copied.
+    """
+    source, destination = os.fspath(source), os.fspath(destination)
+    if os.path.lexists(destination):
+        os.remove(destination)
+    try:
+        if placement == HARDLINK:
+            os.link(source, destination)
+            return HARDLINK
+        if placement == REFLINK:
+            _reflink(source, destination)
+            return REFLINK
+        if placement == SYMLINK:
+            os.symlink(os.path.abspath(source), destination)
+            return SYMLINK
+    except (OSError, NotImplementedError) as e:
+        _warn_fallback(placement, e)
+    shutil.copy2(source, destination)
+    return COPY
@@ -37,6 +37,10 @@ BROWSE = "Browse"
 DEFAULT_INPUT_FOLDER_NAME = "My Songs"
 DEFAULT_OUTPUT_FOLDER_NAME = "_Patch"
 
+# conversion tweaks without a widget, saved back as they were loaded
+CONFIG_ONLY_TWEAKS = ["jobs", "cpu_budget", "max_encoders", "incremental_output", "placement", "video_encode_mode",
+                      "bink_temp_mp4", "run_report", "encoding_detector"]
+
 logger = logging.getLogger(__name__)
 
 
@@ -53,7 +57,7 @@ class QtLogHandler(logging.Handler):
 
 class ConversionWorker(QThread):
     log_message = Signal(str)
-    progress = Signal(int, int)  # (current, total)
+    progress = Signal(int, int, float)  # (current, total, overall fraction including songs being converted)
     finished = Signal()
     error = Signal(str)
 
@@ -62,8 +66,10 @@ class ConversionWorker(QThread):
         self.cfg = cfg
         self.stop_event = stop_event
 
-    def on_progress(self, current, total_song_count):
-        self.progress.emit(current, total_song_count)
+    def on_progress(self, current, total_song_count, fraction=None):
+        if fraction is None:
+            fraction = current / total_song_count if total_song_count else 1.0
+        self.progress.emit(current, total_song_count, fraction)
 
     def run(self):
         try:
@@ -181,6 +187,7 @@ class MainWindow(QMainWindow):
         self.estimated_finish_time = 0.0
         self.progress_current = 0
         self.progress_total = 0
+        self.progress_fraction = 0.0
 
         self.tick_timer = QTimer(self)
         self.tick_timer.setInterval(1000)
@@ -1071,8 +1078,10 @@ class MainWindow(QMainWindow):
         self.conversion_start_time = time.monotonic()
         self.progress_current = 0
         self.progress_total = 0
+        self.progress_fraction = 0.0
         self.progress_bar.setValue(0)
         self.progress_bar.setMaximum(1)
+        self.progress_bar.setFormat("%v/%m  (%p%)")
         self.progress_bar.setVisible(True)
         self.elapsed_label.setText("0:00")
         self.remaining_label.setText("")
@@ -1090,17 +1099,19 @@ class MainWindow(QMainWindow):
         self._worker.start()
 
 
-    def on_progress(self, current: int, total: int) -> None:
+    def on_progress(self, current: int, total: int, fraction: float) -> None:
         self.progress_current = current
         self.progress_total = total
-        self.progress_bar.setMaximum(total)
-        self.progress_bar.setValue(current)
+        # the bar also moves while songs are being encoded, the text keeps counting finished songs
+        self.progress_bar.setMaximum(max(1, total) * 100)
+        self.progress_bar.setValue(int(fraction * max(1, total) * 100))
+        self.progress_bar.setFormat(f"{current}/{total}  (%p%)")
 
         # Estimate the finish time based on average pace so far
-        if current > 0:
+        if fraction > 0:
             elapsed = time.monotonic() - self.conversion_start_time
-            avg_per_song = elapsed / current
-            self.estimated_finish_time = self.conversion_start_time + avg_per_song * total
+            self.estimated_finish_time = self.conversion_start_time + elapsed / fraction
+        self.progress_fraction = fraction
         self.tick_progress()
 
     def tick_progress(self) -> None:
@@ -1108,7 +1119,7 @@ class MainWindow(QMainWindow):
         elapsed = now - self.conversion_start_time
         self.elapsed_label.setText(self.format_duration(elapsed))
 
-        if self.progress_current > 0 and self.progress_current < self.progress_total:
+        if self.progress_fraction > 0 and self.progress_current < self.progress_total:
             remaining = max(0, self.estimated_finish_time - now)
             self.remaining_label.setText(f"-{self.format_duration(remaining)}")
         else:
@@ -1148,7 +1159,7 @@ class MainWindow(QMainWindow):
         if not self.conversion_running:
             return
 
-        self.log("Stopping conversion once the current item is done...")
+        self.log("Stopping conversion...")
         set_element_enabled(self.stop_button, False)
         self.conversion_running = False
         self._stop_event.set()
@@ -1340,6 +1351,9 @@ class MainWindow(QMainWindow):
             "no_medley": self.ignore_medley_checkbox.isChecked(),
             "still_video": self.still_video_checkbox.isChecked(),
         }
+        for key in CONFIG_ONLY_TWEAKS:
+            if self.cfg.conversion_tweaks.get(key) is not None:
+                config_dict["conversion_tweaks"][key] = self.cfg.conversion_tweaks[key]
 
         user_path = Path('.') / 'config.yml'
         with open(user_path, 'w', encoding='utf-8') as f:
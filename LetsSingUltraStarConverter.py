@@ -12,9 +12,11 @@ def _run_cli():
     import argparse
     import logging
 
-    from ConfigLoader import load_config
+    from ConfigLoader import load_config, load_default_config
     import ConvertFiles
-    from ConvertFiles import FAST, SLOW
+    from ConvertFiles import FAST, SLOW, TWO_PASS, CRF
+    from FilePlacement import PLACEMENTS
+    from UltrastarToSingit import ENCODING_DETECTORS
 
     logging.basicConfig(level=logging.DEBUG, format='%(message)s')
 
@@ -53,7 +55,8 @@ def _run_cli():
     folders.add_argument('--input', type=str, metavar='DIR',
                          help='Input folder containing "Artist - Title" song directories from UltraStar')
     folders.add_argument('--output', type=str, metavar='DIR',
-                         help='Output folder for the generated patch (WARNING: folder is purged before each run)')
+                         help='Output folder for the generated patch (WARNING: folder is purged before each run, '
+                              'unless --incremental is used)')
 
     # --- Conversion tweaks ---
     tweaks = parser.add_argument_group('Conversion tweaks')
@@ -62,11 +65,31 @@ def _run_cli():
                              '"slow" uses CREPE neural pitch detection (requires unpacked modules in the plugins folder)')
     tweaks.add_argument('--max-video-size', type=int, metavar='MB',
                         help='Maximum video file size in MB')
+    tweaks.add_argument('--video-encode-mode', type=str.lower, choices=[TWO_PASS, CRF],
+                        help='"two_pass" encodes videos in two passes (default), "crf" uses a single capped CRF pass '
+                             'and only falls back to two passes when the video would exceed the size limit')
+    tweaks.add_argument('--encoding-detector', type=str.lower, choices=ENCODING_DETECTORS,
+                        help='Detector of the .txt encoding when it has no BOM and isn\'t UTF-8, chardet is the last resort '
+                             '(default: auto, cchardet when installed, else chardet)')
+    tweaks.add_argument('--bink-temp-mp4', action='store_true',
+                        help='JSON format: encode an intermediate mp4 at the target size before the Bink encode and keep it '
+                             '(default: hand the scaled frames straight to binkc)')
+    tweaks.add_argument('--report', action='store_true',
+                        help='Write the time, CPU and I/O of every song and stage to run_report.json/.csv in the output folder')
     tweaks.add_argument('--still-video', action='store_true',
                         help='Skip video encoding; generate a static video from the cover image instead')
     tweaks.add_argument('--no-medley', action='store_true',
                         help='Ignore UltraStar medley tags for chorus detection; '
                              'force Genius.com scraping or automatic detection instead')
+    tweaks.add_argument('--jobs', '-j', type=int, metavar='N',
+                        help='Number of songs to convert in parallel (default 1, 0 uses one per CPU core)')
+    tweaks.add_argument('--incremental', action='store_true',
+                        help='Keep the output folder between runs and only copy new or changed files '
+                             'instead of purging it')
+    tweaks.add_argument('--placement', type=str.lower, choices=PLACEMENTS,
+                        help='How converted files are put into the output folder: "copy" (default), '
+                             '"hardlink" or "reflink" to save disk space (copies when the filesystem can\'t), '
+                             '"symlink" for staging only')
 
     # --- DLC song inclusion ---
     dlc_songs = parser.add_argument_group('DLC song inclusion',
@@ -83,6 +106,15 @@ def _run_cli():
     args = parser.parse_args()
     config = load_config()
 
+    # ConvertFiles.main ignores the tweaks unless they are enabled, so these options enable them,
+    # starting from the defaults like a run with the tweaks disabled would
+    enabling_options = ['jobs', 'incremental', 'placement', 'video_encode_mode', 'encoding_detector', 'bink_temp_mp4',
+                        'report']
+    given = [dest for dest in enabling_options if getattr(args, dest) is not None and getattr(args, dest) is not False]
+    if given and not config.conversion_tweaks.enable:
+        config.conversion_tweaks = load_default_config().conversion_tweaks
+        config.conversion_tweaks.enable = True
+
     if args.dlc_id:
         config.dlc.id = args.dlc_id
     if args.dlc_json_name is not None:
@@ -103,8 +135,22 @@ def _run_cli():
         config.conversion_tweaks.max_video_size = args.max_video_size
     if args.no_medley:
         config.conversion_tweaks.no_medley = True
+    if args.video_encode_mode:
+        config.conversion_tweaks.video_encode_mode = args.video_encode_mode
+    if args.encoding_detector:
+        config.conversion_tweaks.encoding_detector = args.encoding_detector
+    if args.bink_temp_mp4:
+        config.conversion_tweaks.bink_temp_mp4 = True
+    if args.report:
+        config.conversion_tweaks.run_report = True
     if args.still_video:
         config.conversion_tweaks.still_video = True
+    if args.jobs is not None:
+        config.conversion_tweaks.jobs = args.jobs
+    if args.incremental:
+        config.conversion_tweaks.incremental_output = True
+    if args.placement:
+        config.conversion_tweaks.placement = args.placement
     if args.include_dlc_songs:
         config.conversion_tweaks.dlc_songs.include = True
     if args.name_txt_path:
@@ -0,0 +1,156 @@
+import json
+import logging
+import os
+import subprocess
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from BuildCache import BuildCache
+
+logger = logging.getLogger(__name__)
+
+MEDIA_INFO_SECTION = 'media_info'
+
+# probe results of this run, keyed by (path, size, mtime_ns)
+_probe_memo = {}
+_probe_memo_lock = threading.Lock()
+
+
+def _parse_rate(rate) -> float:
+    """'30000/1001' -> 29.97, 0 for missing or invalid rates."""
+    try:
+        num, _, den = str(rate).partition('/')
+        return float(num) / float(den or 1)
+    except (ValueError, ZeroDivisionError):
+        return 0.0
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclass
+class MediaInfo:
+    """The ffprobe description of a media file (format and streams)."""
+    path: str
+    format: dict = field(default_factory=dict)
+    streams: list = field(default_factory=list)
+
+    def _stream(self, codec_type):
+        return next((s for s in self.streams if s.get('codec_type') == codec_type), None)
+
+    @property
+    def video_stream(self):
+        return self._stream('video')
+
+    @property
+    def audio_stream(self):
+        return self._stream('audio')
+
+    @property
+    def duration(self) -> float:
+        duration = _to_float(self.format.get('duration'))
+        if duration is None:
+            # some containers only know the duration of their streams
+            durations = [d for d in (_to_float(s.get('duration')) for s in self.streams) if d is not None]
+            duration = max(durations, default=None)
+        if duration is None:
+            raise ValueError(f"Unknown duration for {self.path}")
+        return duration
+
+    @property
+    def bit_rate(self):
+        """Overall bitrate in bit/s, None when the container doesn't tell."""
+        bit_rate = _to_float(self.format.get('bit_rate'))
+        return int(bit_rate) if bit_rate else None
+
+    @property
+    def video_codec(self):
+        return (self.video_stream or {}).get('codec_name')
+
+    @property
+    def audio_codec(self):
+        return (self.audio_stream or {}).get('codec_name')
+
+    @property
+    def resolution(self):
+        video = self.video_stream or {}
+        if video.get('width') and video.get('height'):
+            return int(video['width']), int(video['height'])
+        return None
+
+    @property
+    def frame_rate(self) -> float:
+        video = self.video_stream or {}
+        return _parse_rate(video.get('avg_frame_rate')) or _parse_rate(video.get('r_frame_rate'))
+
+    @property
+    def video_bit_rate(self):
+        bit_rate = _to_float((self.video_stream or {}).get('bit_rate'))
+        return int(bit_rate) if bit_rate else None
+
+    @property
+    def audio_bit_rate(self):
+        bit_rate = _to_float((self.audio_stream or {}).get('bit_rate'))
+        return int(bit_rate) if bit_rate else None
+
+    @property
+    def frame_count(self):
+        """Frames of the video stream, None when the container doesn't tell (some report 0 then)."""
+        frames = _to_float((self.video_stream or {}).get('nb_frames'))
+        return int(frames) if frames else None
+
+    @property
+    def is_single_image(self) -> bool:
+        """The video stream is one picture (cover art, a single frame), so it's a still image without decoding it.
+
+        Image codecs alone don't tell, Motion JPEG videos and animated GIF/WebP use them too.
+        """
+        video = self.video_stream
+        if not video:
+            return False
+        return bool(video.get('disposition', {}).get('attached_pic')) or self.frame_count == 1
+
+
+def _run_ffprobe(path, ffprobe_path, run) -> dict:
+    cmd = [ffprobe_path, '-v', 'error', '-show_format', '-show_streams', '-of', 'json', path]
+    result = run(cmd) if run else subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffprobe failed for {path}")
+    data = json.loads(result.stdout or '{}')
+    return {'format': data.get('format', {}), 'streams': data.get('streams', [])}
+
+
+def probe(path, ffprobe_path='ffprobe', run=None, persist=True) -> MediaInfo:
+    """Describe a media file with a single ffprobe call.
+
+    Results are kept in memory for the run and, with persist, in the build cache of the file's
+    folder, so an unchanged file (same size and mtime) is never probed again.
+    run(cmd) can be given to run ffprobe in a process pool, it must capture stdout.
+    """
+    path = os.fspath(path)
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    with _probe_memo_lock:
+        if key in _probe_memo:
+            return MediaInfo(path, **_probe_memo[key])
+
+    cache = BuildCache.for_dir(Path(path).parent) if persist else None
+    section = cache.section(MEDIA_INFO_SECTION) if cache else {}
+    name = Path(path).name
+    entry = section.get(name)
+    if entry and entry.get('size') == stat.st_size and entry.get('mtime_ns') == stat.st_mtime_ns:
+        data = entry['probe']
+    else:
+        logger.debug(f"Probing {name}")
+        data = _run_ffprobe(path, ffprobe_path, run)
+        if cache:
+            cache.store(MEDIA_INFO_SECTION, name, {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'probe': data})
+
+    with _probe_memo_lock:
+        _probe_memo[key] = data
+    return MediaInfo(path, **data)
@@ -0,0 +1,114 @@
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+
+from FilePlacement import COPY, place_file
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE_NAME = '.manifest.json'
+MANIFEST_VERSION = 1
+
+# song tags needed to regenerate the name.txt / SongsDLC.tsv / songs json entries
+SONG_TAGS = ('TITLE', 'ARTIST', 'YEAR', 'GENRE')
+
+
+class OutputManifest:
+    """Tracks every song and file placed into the output folder.
+
+    It lets a run only copy the files whose source changed, remove the files of songs that
+    disappeared and regenerate the files shared by all songs without converting them again.
+    """
+
+    def __init__(self, output_dir):
+        self.output_dir = Path(output_dir)
+        self.path = self.output_dir / MANIFEST_FILE_NAME
+        self._lock = threading.Lock()
+        self._touched = {}
+        self._data = self._load()
+
+    def _load(self) -> dict:
+        if self.path.exists():
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if data.get('version') == MANIFEST_VERSION:
+                    return data
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable output manifest {self.path}: {e}")
+        return {'version': MANIFEST_VERSION, 'songs': {}}
+
+    def save(self) -> None:
+        with self._lock:
+            os.makedirs(self.output_dir, exist_ok=True)
+            temp_path = self.path.with_name(self.path.name + '.tmp')
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._data, f, indent=2, ensure_ascii=False)
+            os.replace(temp_path, self.path)
+
+    @property
+    def songs(self) -> dict:
+        return self._data['songs']
+
+    def _song(self, name_id) -> dict:
+        return self._data['songs'].setdefault(name_id, {'dir': None, 'tags': {}, 'files': {}})
+
+    def set_song(self, name_id, dir_long_name, txt_data) -> None:
+        with self._lock:
+            song = self._song(name_id)
+            song['dir'] = dir_long_name
+            song['tags'] = {tag: txt_data[tag] for tag in SONG_TAGS if tag in txt_data}
+
+    def place(self, name_id, source, destination, incremental=True, placement=COPY) -> bool:
+        """Place source at destination (a path in the output folder), returns False when it was already up to date."""
+        source, destination = Path(source), Path(destination)
+        relative = destination.relative_to(self.output_dir).as_posix()
+        stat = source.stat()
+        fingerprint = {'source': os.fspath(source), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns,
+                       'placement': placement}
+        with self._lock:
+            files = self._song(name_id)['files']
+            self._touched.setdefault(name_id, set()).add(relative)
+            up_to_date = (incremental and files.get(relative) == fingerprint
+                          and destination.exists() and destination.stat().st_size == stat.st_size)
+        if not up_to_date:
+            os.makedirs(destination.parent, exist_ok=True)
+            place_file(source, destination, placement)
+        with self._lock:
+            files[relative] = fingerprint
+        return not up_to_date
+
+    def _delete_files(self, files) -> None:
+        for relative in files:
+            path = self.output_dir / relative
+            try:
+                if path.exists() or path.is_symlink():
+                    path.unlink()
+            except OSError as e:
+                logger.error(f"Could not remove {path}: {e}")
+
+    def remove_song(self, name_id) -> None:
+        """Delete every placed file of a song and forget it."""
+        with self._lock:
+            song = self._data['songs'].pop(name_id, None)
+            self._touched.pop(name_id, None)
+        if song:
+            logger.info(f"Removing {name_id} from the output folder")
+            self._delete_files(song['files'])
+
+    def remove_stale_files(self) -> None:
+        """Delete files placed by an earlier run for songs that don't produce them anymore (e.g. format change)."""
+        with self._lock:
+            stale = []
+            for name_id, touched in self._touched.items():
+                files = self._data['songs'].get(name_id, {}).get('files', {})
+                for relative in [r for r in files if r not in touched]:
+                    stale.append(relative)
+                    del files[relative]
+        self._delete_files(stale)
+
+    def name_id_for_dir(self, dir_long_name):
+        with self._lock:
+            return next((name_id for name_id, song in self._data['songs'].items() if song['dir'] == dir_long_name), None)
@@ -44,14 +44,10 @@ def get_txt_pitch_values(txt_data):
     note_count = 0
     all_pitches = []
     for note in txt_data["notes"]:
-        if note[0] == ":" or note[0] == "*":
-            try:
-                pitch = int(note[3])
-                total_pitch += pitch
-                note_count += 1
-                all_pitches.append(pitch)
-            except (ValueError, IndexError):
-                continue
+        if note.kind == ":" or note.kind == "*":
+            total_pitch += note.pitch
+            note_count += 1
+            all_pitches.append(note.pitch)
     average_pitch = int(round(total_pitch / note_count))
     median_pitch = int(round(statistics.median_grouped(all_pitches) if all_pitches else 0))
     min_pitch = min(all_pitches) if all_pitches else 0
@@ -0,0 +1,184 @@
+import csv
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field, fields
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+REPORT_JSON_FILE_NAME = 'run_report.json'
+REPORT_CSV_FILE_NAME = 'run_report.csv'
+
+# (report, record) of the stage running in the current thread
+_local = threading.local()
+
+
+def _file_sizes(paths) -> int:
+    total = 0
+    for path in paths:
+        try:
+            total += os.path.getsize(path)
+        except OSError:
+            pass
+    return total
+
+
+def _children_cpu_time():
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+@dataclass
+class StageRecord:
+    """Timing of one stage of one song (video, audio, covers, vxla, genius...)."""
+    song: str
+    stage: str
+    status: str = 'ok'  # ok, cached (up to date or not needed, nothing done) or failed
+    start: float = 0.0  # seconds since the start of the run
+    wall_time: float = 0.0
+    cpu_time: float = 0.0  # of this process's thread only, the tools' CPU is only known for the whole run
+    input_bytes: int = 0  # size of the input files, not the bytes actually read
+    output_bytes: int = 0  # size of the output files once the stage is done
+    subprocess_count: int = 0
+    subprocess_wall_time: float = 0.0  # elapsed while the tools ran, waiting for their slot not included
+    exit_codes: list = field(default_factory=list)
+
+
+class RunReport:
+    """Collects per-song, per-stage timings of a conversion run and writes them as JSON and CSV."""
+
+    def __init__(self):
+        self.records = []
+        self.started_at = time.time()
+        self.wall_time = None
+        self.subprocess_cpu_time = None
+        self._start = time.perf_counter()
+        self._children_cpu_start = _children_cpu_time()
+        self._song_spans = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, song, stage, inputs=(), outputs=()):
+        """Time the code run in the block, inputs and outputs are the files it reads and writes."""
+        record = StageRecord(song, stage)
+        previous = getattr(_local, 'stage', None)
+        _local.stage = (self, record)
+        wall_start, cpu_start = time.perf_counter(), time.thread_time()
+        record.start = wall_start - self._start
+        try:
+            yield record
+        except BaseException:
+            record.status = 'failed'
+            raise
+        finally:
+            record.wall_time = time.perf_counter() - wall_start
+            record.cpu_time = time.thread_time() - cpu_start
+            if record.status != 'cached':
+                record.input_bytes = _file_sizes(inputs)
+                record.output_bytes = _file_sizes(outputs)
+            _local.stage = previous
+            with self._lock:
+                self.records.append(record)
+
+    @contextmanager
+    def song(self, song):
+        """Time the whole conversion of a song, waiting for the CPU included, its stages are timed on their own."""
+        start = time.perf_counter() - self._start
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._song_spans.setdefault(song, []).append((start, time.perf_counter() - self._start))
+
+    def finish(self) -> None:
+        self.wall_time = time.perf_counter() - self._start
+        children_cpu_end = _children_cpu_time()
+        if children_cpu_end is not None and self._children_cpu_start is not None:
+            self.subprocess_cpu_time = children_cpu_end - self._children_cpu_start
+
+    def song_times(self) -> dict:
+        """Elapsed time of each song, stages running at the same time are only counted once."""
+        spans = {song: list(song_spans) for song, song_spans in self._song_spans.items()}
+        for record in self.records:
+            if '/' not in record.stage:
+                spans.setdefault(record.song, []).append((record.start, record.start + record.wall_time))
+        times = {}
+        for song, song_spans in spans.items():
+            total, covered_until = 0.0, None
+            for start, end in sorted(song_spans):
+                if covered_until is not None:
+                    start = max(start, covered_until)
+                if end > start:
+                    total += end - start
+                covered_until = end if covered_until is None else max(covered_until, end)
+            times[song] = total
+        return times
+
+    def stage_times(self) -> dict:
+        times = {}
+        for record in self.records:
+            times[record.stage] = times.get(record.stage, 0.0) + record.wall_time
+        return times
+
+    def summary_lines(self, count=5) -> list:
+        lines = [f'Run time: {self.wall_time or 0:.1f}s, {len(self.song_times())} songs']
+        if self.subprocess_cpu_time is not None:
+            lines[0] += f', CPU time of the external tools (all songs): {self.subprocess_cpu_time:.1f}s'
+        lines.append('Slowest songs:')
+        for song, seconds in sorted(self.song_times().items(), key=lambda item: -item[1])[:count]:
+            lines.append(f'  {seconds:8.1f}s  {song}')
+        lines.append('Slowest stages (all songs):')
+        for stage, seconds in sorted(self.stage_times().items(), key=lambda item: -item[1])[:count]:
+            lines.append(f'  {seconds:8.1f}s  {stage}')
+        return lines
+
+    def write(self, directory) -> None:
+        os.makedirs(directory, exist_ok=True)
+        data = {
+            'started_at': self.started_at,
+            'wall_time': self.wall_time,
+            'subprocess_cpu_time': self.subprocess_cpu_time,
+            'songs': self.song_times(),
+            'stages': [asdict(record) for record in self.records],
+        }
+        with open(os.path.join(directory, REPORT_JSON_FILE_NAME), 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        with open(os.path.join(directory, REPORT_CSV_FILE_NAME), 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow([f.name for f in fields(StageRecord)])
+            for record in self.records:
+                row = asdict(record)
+                row['exit_codes'] = ' '.join(str(code) for code in record.exit_codes)
+                writer.writerow(row.values())
+
+
+@contextmanager
+def timed(stage):
+    """Time a part of the stage running in this thread as its own 'parent/stage' entry, no-op outside a stage."""
+    current = getattr(_local, 'stage', None)
+    if current is None:
+        yield None
+        return
+    report, parent = current
+    with report.stage(parent.song, f'{parent.stage}/{stage}') as record:
+        yield record
+
+
+def record_subprocess(returncode, elapsed) -> None:
+    """Count an external tool run by the stage running in this thread."""
+    current = getattr(_local, 'stage', None)
+    if current is not None:
+        record = current[1]
+        record.subprocess_count += 1
+        record.subprocess_wall_time += elapsed
+        record.exit_codes.append(returncode)
@@ -0,0 +1,198 @@
+import logging
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# times a waiting reservation lets smaller ones that fit go ahead of it, after that it blocks the queue
+MAX_BYPASSES = 8
+
+
+class _Reservation:
+    __slots__ = ('cost', 'bypassed')
+
+    def __init__(self, cost):
+        self.cost = cost
+        self.bypassed = 0
+
+
+class CpuBudget:
+    """Counting semaphore shared by every task graph of a conversion run.
+
+    Each task reserves as many units as the CPU cores it keeps busy. Reservations are served in order,
+    except that one fitting in the free units may go ahead of older ones waiting for more units, so
+    light tasks keep running next to the encodes. A reservation passed MAX_BYPASSES times isn't passed
+    anymore, so a big task isn't starved by a stream of small ones.
+    """
+
+    def __init__(self, units=None):
+        self.units = max(1, int(units or os.cpu_count() or 1))
+        self._available = self.units
+        self._condition = threading.Condition()
+        self._waiting = []  # oldest first
+
+    def clamp(self, cost) -> int:
+        return min(max(1, int(cost)), self.units)
+
+    def _can_start(self, reservation) -> bool:
+        if self._available < reservation.cost:
+            return False
+        for older in self._waiting:
+            if older is reservation:
+                return True
+            if older.bypassed >= MAX_BYPASSES:
+                return False
+        return True
+
+    def acquire(self, cost) -> int:
+        cost = self.clamp(cost)
+        reservation = _Reservation(cost)
+        with self._condition:
+            self._waiting.append(reservation)
+            self._condition.wait_for(lambda: self._can_start(reservation))
+            position = next(i for i, waiting in enumerate(self._waiting) if waiting is reservation)
+            for older in self._waiting[:position]:
+                older.bypassed += 1
+            del self._waiting[position]
+            self._available -= cost
+            self._condition.notify_all()
+        return cost
+
+    def release(self, cost) -> None:
+        with self._condition:
+            self._available += cost
+            self._condition.notify_all()
+
+    @contextmanager
+    def reserve(self, cost):
+        cost = self.acquire(cost)
+        try:
+            yield cost
+        finally:
+            self.release(cost)
+
+
+class Task:
+    """A node of the graph, producing its outputs from its inputs (file paths or any hashable key).
+
+    cost can be a function, called once the task's dependencies are done, when the work it has to
+    do depends on their results.
+    """
+
+    def __init__(self, name, func, inputs=(), outputs=(), cost=1):
+        self.name = name
+        self.func = func
+        self.inputs = [os.fspath(i) for i in inputs]
+        self.outputs = [os.fspath(o) for o in outputs]
+        self.cost = cost
+
+    def __repr__(self):
+        return f"Task({self.name!r})"
+
+
+class TaskGraph:
+    """Runs tasks as soon as the tasks producing their inputs are done, within a shared CPU budget.
+
+    A task depends on every other task that declares one of its inputs as an output. Inputs nobody
+    produces are source files and are expected to exist already.
+    """
+
+    def __init__(self, budget=None, name=''):
+        self.budget = budget or CpuBudget()
+        self.name = name
+        self.tasks = []
+
+    def add(self, name, func, inputs=(), outputs=(), cost=1) -> Task:
+        task = Task(name, func, inputs, outputs, cost)
+        self.tasks.append(task)
+        return task
+
+    def dependencies(self) -> dict:
+        producers = {}
+        for task in self.tasks:
+            for output in task.outputs:
+                producers.setdefault(output, []).append(task)
+        deps = {}
+        for task in self.tasks:
+            deps[task] = {producer for i in task.inputs for producer in producers.get(i, []) if producer is not task}
+        self._check_for_cycles(deps)
+        return deps
+
+    @staticmethod
+    def _check_for_cycles(deps) -> None:
+        visiting, visited = set(), set()
+
+        def visit(task, path):
+            if task in visited:
+                return
+            if task in visiting:
+                raise ValueError(f"Task graph has a cycle: {' -> '.join(t.name for t in path + [task])}")
+            visiting.add(task)
+            for dep in deps[task]:
+                visit(dep, path + [task])
+            visiting.discard(task)
+            visited.add(task)
+
+        for task in deps:
+            visit(task, [])
+
+    def _run_task(self, task):
+        cost = task.cost() if callable(task.cost) else task.cost
+        with self.budget.reserve(cost):
+            logger.debug(f"[{self.name}] starting {task.name}")
+            return task.func()
+
+    def run(self, stop_event=None) -> None:
+        """Run every task, raises the first task error once the tasks already running are done.
+
+        Tasks depending on a failed task are skipped, unrelated tasks still run so their results
+        can be reused on the next run.
+        """
+        if not self.tasks:
+            return
+        deps = self.dependencies()
+        remaining = {task: set(task_deps) for task, task_deps in deps.items()}
+        dependents = {task: [t for t in self.tasks if task in deps[t]] for task in self.tasks}
+        errors = []
+        running = {}
+
+        def stopping():
+            return stop_event is not None and stop_event.is_set()
+
+        def skip(failed_task):
+            for dependent in dependents[failed_task]:
+                if dependent in remaining:
+                    if not stopping():
+                        logger.warning(f"[{self.name}] skipping {dependent.name}, {failed_task.name} failed")
+                    del remaining[dependent]
+                    skip(dependent)
+
+        with ThreadPoolExecutor(max_workers=len(self.tasks), thread_name_prefix=f'{self.name}-task') as executor:
+            while remaining or running:
+                if not stopping():
+                    for task in [t for t, pending in remaining.items() if not pending]:
+                        del remaining[task]
+                        running[executor.submit(self._run_task, task)] = task
+                elif remaining:
+                    remaining.clear()
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    task = running.pop(future)
+                    error = future.exception()
+                    if error:
+                        # tasks interrupted by a stop request aren't errors worth reporting
+                        log = logger.debug if stopping() else logger.error
+                        log(f"[{self.name}] {task.name} failed: {error}")
+                        errors.append(error)
+                        skip(task)
+                        continue
+                    for dependent in dependents[task]:
+                        if dependent in remaining:
+                            remaining[dependent].discard(task)
+
+        if errors:
+            raise errors[0]
@@ -1,11 +1,18 @@
+import bisect
+import codecs
 import io
+import itertools
 import json
 import logging
 import os
 import re
+import threading
 import xml.etree.cElementTree as ET
+from collections import Counter
+from dataclasses import dataclass
 from difflib import SequenceMatcher
 from pathlib import Path
+from typing import Optional
 from xml.dom import minidom
 
 import chardet
@@ -14,9 +21,43 @@ import unicodedata
 from Levenshtein import distance as levenshtein_distance
 from bs4 import BeautifulSoup
 
+from BuildCache import BuildCache
+from RunReport import timed
+
+try:
+    import charset_normalizer
+except ImportError:
+    charset_normalizer = None
+try:
+    import cchardet
+except ImportError:
+    cchardet = None
+
 XML = 'xml'
 JSON = 'json'
 
+NOTE_TYPES = (':', '*', 'F', 'R', 'G')
+LINE_BREAK = '-'
+
+# detectors used when a file has no BOM and isn't valid UTF-8, chardet is always the last resort.
+# auto uses cchardet when installed (same guesses as chardet, much faster), charset_normalizer is opt-in
+# as it tends to mistake short western European lyrics in cp1252 for other code pages
+AUTO = 'auto'
+ENCODING_DETECTORS = (AUTO, 'charset_normalizer', 'cchardet', 'chardet')
+# bytes given to chardet/cchardet, charset_normalizer samples the whole file by itself
+DETECTION_SAMPLE_SIZE = 4096
+ENCODING_SECTION = 'encoding'
+# the 32 bit BOMs start with the 16 bit ones, they must be checked first
+BOMS = [
+    (codecs.BOM_UTF32_LE, 'utf-32'), (codecs.BOM_UTF32_BE, 'utf-32'), (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'), (codecs.BOM_UTF16_BE, 'utf-16'),
+]
+
+_encoding_detector = AUTO
+# encodings detected in this run, keyed by (path, size, mtime_ns)
+_encoding_memo = {}
+_encoding_memo_lock = threading.Lock()
+
 logger = logging.getLogger(__name__)
 
 GENIUS_HEADERS = {
@@ -51,15 +92,148 @@ def normalize_for_url(text):
     text = text.strip('-')
     return text
 
+def set_encoding_detector(detector):
+    global _encoding_detector
+    if detector not in ENCODING_DETECTORS:
+        raise ValueError(f"Unknown encoding detector '{detector}', expected one of {', '.join(ENCODING_DETECTORS)}")
+    _encoding_detector = detector
+
+
+def _guess_encoding(rawdata, detector):
+    if detector == 'charset_normalizer' and charset_normalizer is not None:
+        match = charset_normalizer.from_bytes(rawdata).best()
+        if match:
+            return match.encoding
+    if detector in (AUTO, 'cchardet') and cchardet is not None:
+        encoding = cchardet.detect(rawdata[:DETECTION_SAMPLE_SIZE])['encoding']
+        if encoding:
+            return encoding
+    return chardet.detect(rawdata[:DETECTION_SAMPLE_SIZE])['encoding'] or 'utf-8'
+
+
+def detect_encoding_of_bytes(rawdata, detector=None):
+    """Returns (encoding, guessed), guessed is False when a BOM or a strict UTF-8 decode settled it."""
+    for bom, encoding in BOMS:
+        if rawdata.startswith(bom):
+            return encoding, False
+    try:
+        rawdata.decode('utf-8')
+        return 'utf-8', False
+    except UnicodeDecodeError:
+        pass
+    return _guess_encoding(rawdata, detector or _encoding_detector), True
+
+
 def detect_encoding(filename):
-    with open(filename, 'rb') as f:
-        rawdata = f.read(4096)
-    result = chardet.detect(rawdata)
-    return result['encoding'] or 'utf-8'
+    """Encoding of a text file, from its BOM, a strict UTF-8 decode or else a statistical detector.
+
+    Results are kept for the run, guessed ones also in the build cache of the file's folder as they
+    are the slow ones, so an unchanged file (same size and mtime) is only looked at once.
+    """
+    path = os.fspath(filename)
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    with _encoding_memo_lock:
+        if key in _encoding_memo:
+            return _encoding_memo[key]
+
+    cache = BuildCache.for_dir(Path(path).parent)
+    name = Path(path).name
+    entry = cache.section(ENCODING_SECTION).get(name)
+    if (entry and entry.get('size') == stat.st_size and entry.get('mtime_ns') == stat.st_mtime_ns
+            and entry.get('detector') == _encoding_detector):
+        encoding = entry['encoding']
+    else:
+        with open(path, 'rb') as f:
+            rawdata = f.read()
+        encoding, guessed = detect_encoding_of_bytes(rawdata)
+        if guessed:
+            log_debug(f"Detected encoding of {name}: {encoding}")
+            cache.store(ENCODING_SECTION, name, {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns,
+                                                 'detector': _encoding_detector, 'encoding': encoding})
+
+    with _encoding_memo_lock:
+        _encoding_memo[key] = encoding
+    return encoding
+
+class Note:
+    """A row of the song body with its numbers converted once.
+
+    Notes (NOTE_TYPES) have all the fields, line breaks ('-') only a start beat, the other rows
+    (end 'E', duet singer 'P1'...) only their kind.
+    """
+    __slots__ = ('kind', 'start', 'length', 'pitch', 'lyric')
+
+    def __init__(self, kind, start=0, length=0, pitch=0, lyric=''):
+        self.kind = kind
+        self.start = start
+        self.length = length
+        self.pitch = pitch
+        self.lyric = lyric
+
+    def __repr__(self):
+        return f"Note({self.kind!r}, {self.start}, {self.length}, {self.pitch}, {self.lyric!r})"
+
+
+def parse_note(line) -> Note:
+    fields = line.split(" ", 4)
+    kind = fields[0]
+    if kind in NOTE_TYPES:
+        return Note(kind, int(fields[1]), int(fields[2]), int(fields[3]), fields[4] if len(fields) > 4 else '')
+    if kind == LINE_BREAK:
+        return Note(kind, int(fields[1]))
+    return Note(kind)
+
+
+@dataclass
+class SongHeader:
+    """The numeric tags of a song, converted once when the file is parsed."""
+    bpm: Optional[float] = None
+    gap: float = 0.0  # seconds, #GAP is in milliseconds
+    video_gap: float = 0.0  # seconds
+    medley_start_beat: Optional[int] = None
+    medley_end_beat: Optional[int] = None
+    preview_start: Optional[float] = None  # seconds
+
+    @property
+    def has_medley(self) -> bool:
+        return self.medley_start_beat is not None and self.medley_end_beat is not None
+
+    def beat_to_seconds(self, beat) -> float:
+        return beat * 60 / self.bpm / 4
+
+
+def _tag_value(data, tag, convert, strict=False):
+    """The converted value of a tag, None when it is missing or, unless strict, invalid."""
+    value = data.get(tag)
+    if value is None:
+        return None
+    try:
+        return convert(value.replace(',', '.') if convert is float else value)
+    except ValueError:
+        if strict:
+            raise ValueError(f"Invalid #{tag} value: {value!r}")
+        logger.warning(f"Ignoring invalid #{tag} value: {value!r}")
+        return None
+
+
+def parse_header(data) -> SongHeader:
+    # the timing of every note depends on BPM and GAP, the other tags are optional and ignored when invalid
+    gap = _tag_value(data, 'GAP', float, strict=True)
+    video_gap = _tag_value(data, 'VIDEOGAP', float)
+    return SongHeader(
+        bpm=_tag_value(data, 'BPM', float, strict=True),
+        gap=gap / 1000 if gap is not None else 0.0,
+        video_gap=video_gap if video_gap is not None else 0.0,
+        medley_start_beat=_tag_value(data, 'MEDLEYSTARTBEAT', int),
+        medley_end_beat=_tag_value(data, 'MEDLEYENDBEAT', int),
+        preview_start=_tag_value(data, 'PREVIEWSTART', float),
+    )
+
 
 def parse_file(filename):
     data = {
-        "notes": [], # represents rows in the txt file
+        "notes": [], # the rows of the txt file as Note objects
         "lyrics_map_list": [] # a list of maps, each map contains a full word lyric and a start beat
                               # (lyrics spread over multiple beats are grouped by the starting beat)
     }
@@ -72,10 +246,41 @@ def parse_file(filename):
                 if len(p) == 2:
                     data[p[0][1:]] = p[1]
             else:
-                note_arr = line.split(" ", 4)
-                data["notes"].append(note_arr)
+                data["notes"].append(parse_note(line))
+    # the tags stay available as text, "header" has the numeric ones
+    data["header"] = parse_header(data)
     return data
 
+class IntervalIndex:
+    """Finds the intervals (dicts with t1 and t2) overlapping a time range without scanning all of them."""
+
+    def __init__(self, intervals):
+        self.intervals = intervals
+        self._order = sorted(range(len(intervals)), key=lambda i: intervals[i]["t1"])
+        self._starts = [intervals[i]["t1"] for i in self._order]
+        # latest end of the intervals up to each position, never decreasing so it can be bisected too
+        self._max_ends = list(itertools.accumulate((intervals[i]["t2"] for i in self._order), max))
+
+    def overlapping(self, t1, t2):
+        """Indexes of the intervals with t1 < interval t2 and interval t1 < t2, in their original order."""
+        first = bisect.bisect_right(self._max_ends, t1)
+        last = bisect.bisect_left(self._starts, t2)
+        return sorted(i for i in self._order[first:last] if self.intervals[i]["t2"] > t1)
+
+def may_reach_ratio(a, b, a_counts, b_counts, min_ratio):
+    """False when SequenceMatcher(None, a, b).ratio() is sure to be below min_ratio.
+
+    ratio() is 2 * matches / (len(a) + len(b)). The bounds use the same formula with at least as many
+    matches: all of the shorter text (real_quick_ratio), then all the shared characters (quick_ratio,
+    from the Counters of the characters of a and b), so they never rule out a pair ratio() would keep.
+    """
+    length = len(a) + len(b)
+    if not length:
+        return True
+    if 2.0 * min(len(a), len(b)) / length < min_ratio:
+        return False
+    return 2.0 * sum((a_counts & b_counts).values()) / length >= min_ratio
+
 def find_refrains(sing_it):
     # Group lyrics by page and find similarity with sequencematcher
     sections = []
@@ -86,11 +291,11 @@ def find_refrains(sing_it):
         else:
             return []
 
+    text_index = IntervalIndex(sing_it["text"])
     for i, page in enumerate(sing_it["pages"]):
         section_text = ""
-        for text_note in sing_it["text"]:
-            if text_note["t1"] < page["t2"] and text_note["t2"] > page["t1"]:
-                section_text += text_note["value"].replace('-', '').replace('~', '').strip().lower()
+        for n in text_index.overlapping(page["t1"], page["t2"]):
+            section_text += sing_it["text"][n]["value"].replace('-', '').replace('~', '').strip().lower()
 
         if section_text:
             sections.append({
@@ -104,6 +309,12 @@ def find_refrains(sing_it):
     MIN_SEPARATION = 10.0 # Verses should be separate by at least 10 seconds
     MIN_SIMILARITY = 0.85 # Verses should have at least 85% similarity
 
+    # only the pairs far enough apart that could reach MIN_SIMILARITY go through SequenceMatcher,
+    # a matcher is kept per page (it indexes its second text) and repeated text pairs are scored once
+    char_counts = [Counter(section["text"]) for section in sections]
+    matchers = {}
+    similarities = {}
+
     for i in range(len(sections)):
         section_a = sections[i]
         
@@ -113,12 +324,22 @@ def find_refrains(sing_it):
         for j in range(i + 1, len(sections)):
             section_b = sections[j]
 
-            similarity = SequenceMatcher(None, section_a["text"], section_b["text"]).ratio()
+            if (section_b["t1"] - section_a["t2"]) <= MIN_SEPARATION:
+                continue
+            if not may_reach_ratio(section_a["text"], section_b["text"], char_counts[i], char_counts[j], MIN_SIMILARITY):
+                continue
+
+            text_pair = (section_a["text"], section_b["text"])
+            similarity = similarities.get(text_pair)
+            if similarity is None:
+                if j not in matchers:
+                    matchers[j] = SequenceMatcher(None, "", section_b["text"])
+                matchers[j].set_seq1(section_a["text"])
+                similarity = similarities[text_pair] = matchers[j].ratio()
 
             if similarity >= MIN_SIMILARITY:
-                if (section_b["t1"] - section_a["t2"]) > MIN_SEPARATION:
-                    refrains.append({"t1": section_a["t1"], "t2": section_a["t2"], "value": "feat"})
-                    refrains.append({"t1": section_b["t1"], "t2": section_b["t2"], "value": "feat"})
+                refrains.append({"t1": section_a["t1"], "t2": section_a["t2"], "value": "feat"})
+                refrains.append({"t1": section_b["t1"], "t2": section_b["t2"], "value": "feat"})
                     
     unique_refrains = []
     seen_intervals = set()
@@ -149,27 +370,25 @@ def merge_intervals(intervals):
 
 def map_data(us_data, song_duration, pitch_corr, input_file_name, ignore_medley=False):
     sing_it = {"text": [], "notes": [], "pages": [], "structure": []}
-    bpm = float(us_data["BPM"].replace(',', '.'))
-    if "GAP" in us_data:
-        gap = float(us_data["GAP"].replace(',', '.')) / 1000
-    else:
-        gap = 0.0
-    video_gap = 0.0
-    if "VIDEOGAP" in us_data:
-        # how many seconds the song is out of sync with the video
-        #  positive - video starts before the song, the song will have silence added to the beginning
-        #  negative - video starts after the song, the song will be trimmed at the start
-        video_gap = float(us_data["VIDEOGAP"].replace(',', '.'))
+    header = us_data["header"]
+    if header.bpm is None:
+        raise ValueError("Missing #BPM tag")
+    bpm = header.bpm
+    gap = header.gap
+    # how many seconds the song is out of sync with the video
+    #  positive - video starts before the song, the song will have silence added to the beginning
+    #  negative - video starts after the song, the song will be trimmed at the start
+    video_gap = header.video_gap
 
     last_page = 0.0
     end = 1
-    previous_line = []
+    previous_line = None
     
     for note in us_data["notes"]:
-        if note[0] in [':', '*', 'F', 'R', 'G']:
-            start = float(note[1]) * 60 / bpm / 4 + gap + video_gap
-            end = start + float(note[2]) * 60 / bpm / 4
-            lyric_text = normalize_text(note[4])
+        if note.kind in NOTE_TYPES:
+            start = float(note.start) * 60 / bpm / 4 + gap + video_gap
+            end = start + float(note.length) * 60 / bpm / 4
+            lyric_text = normalize_text(note.lyric)
             
             if lyric_text.strip() != "~": # if the lyric is just a tilde, don't add it to on-screen lyrics
                 final_lyric = lyric_text.replace('~', '') # tildes in the middle of bottom lyrics are ugly
@@ -182,14 +401,14 @@ def map_data(us_data, song_duration, pitch_corr, input_file_name, ignore_medley=
                 is_new_word = (
                     len(us_data['lyrics_map_list']) == 0 or 
                     lyric_text.startswith(" ") or 
-                    (len(previous_line) > 0 and previous_line[0] in ['-']) or
+                    (previous_line is not None and previous_line.kind == LINE_BREAK) or
                     previous_word_ended_with_space 
                 )
 
                 if is_new_word:
                     us_data['lyrics_map_list'].append({
-                        'start_beat': int(note[1]),
-                        'end_beat': int(note[1]) + int(note[2]),
+                        'start_beat': note.start,
+                        'end_beat': note.start + note.length,
                         'lyrics': lyric_text
                     })
                 else:
@@ -197,7 +416,7 @@ def map_data(us_data, song_duration, pitch_corr, input_file_name, ignore_medley=
                     # concatenate with previous lyric text
                     # (the word starts without a space and the previous line wasn't a page break)
                         us_data['lyrics_map_list'][-1]['lyrics'] += lyric_text
-                        us_data['lyrics_map_list'][-1]['end_beat'] = int(note[1]) + int(note[2])
+                        us_data['lyrics_map_list'][-1]['end_beat'] = note.start + note.length
                 
                 previous_line = note
             else:
@@ -208,8 +427,8 @@ def map_data(us_data, song_duration, pitch_corr, input_file_name, ignore_medley=
                         us_data['lyrics_map_list'][-1]['lyrics'] += " "
                 previous_line = note
 
-            pitch = int(note[3])
-            note_type = note[0]
+            pitch = note.pitch
+            note_type = note.kind
             if note_type in ["R", "F"]: full_note = f"#p1#.{final_lyric}"
             elif note_type == "G": full_note = f"#p1#.{final_lyric}#g5"
             elif note_type == "*": full_note = f"#p{pitch + pitch_corr}#.{final_lyric}#g5"
@@ -217,9 +436,9 @@ def map_data(us_data, song_duration, pitch_corr, input_file_name, ignore_medley=
             
             sing_it["notes"].append({"t1": start, "t2": end, "value": full_note})
 
-        elif note[0] == "-":
+        elif note.kind == LINE_BREAK:
             start = last_page
-            end = float(note[1]) * 60 / bpm / 4 + gap + video_gap
+            end = float(note.start) * 60 / bpm / 4 + gap + video_gap
             last_page = end
             sing_it["pages"].append({"t1": start, "t2": end, "value": ""})
             
@@ -229,7 +448,7 @@ def map_data(us_data, song_duration, pitch_corr, input_file_name, ignore_medley=
             
             previous_line = note
 
-        elif note[0] == "E":
+        elif note.kind == "E":
             if end > last_page:
                 start = last_page
                 sing_it["pages"].append({"t1": start, "t2": end, "value": ""})
@@ -238,12 +457,12 @@ def map_data(us_data, song_duration, pitch_corr, input_file_name, ignore_medley=
     log_debug("--- Analyzing Structure ---")
     choruses = []
     
-    has_medley = 'MEDLEYSTARTBEAT' in us_data and 'MEDLEYENDBEAT' in us_data
+    has_medley = header.has_medley
     
     if has_medley and not ignore_medley:
         log_debug("Using MEDLEY tags from ultrastar file.")
-        m_start = int(us_data['MEDLEYSTARTBEAT'])
-        m_end = int(us_data['MEDLEYENDBEAT'])
+        m_start = header.medley_start_beat
+        m_end = header.medley_end_beat
         chorus_txt = get_lyrics_for_beat_range(us_data['lyrics_map_list'], m_start, m_end)
         choruses = [chorus_txt] * 5
     else:
@@ -251,7 +470,8 @@ def map_data(us_data, song_duration, pitch_corr, input_file_name, ignore_medley=
             log_debug("Tags MEDLEY ignoradas (Argument --no-medley activated).")
         artist = us_data.get('ARTIST', '')
         title = us_data.get('TITLE', '')
-        choruses = genius_get_choruses(input_file_name, artist=artist, title=title)
+        with timed('genius'):
+            choruses = genius_get_choruses(input_file_name, artist=artist, title=title)
 
     if choruses:
         matched = match_choruses_to_beats(us_data['lyrics_map_list'], choruses, similarity_threshold=0.7)
@@ -348,9 +568,14 @@ def genius_search_for_correct_path(artist, title):
     log_debug("No song matches found on Genius.")
     return None
 
+def genius_cache_path(input_file_name):
+    """File keeping the choruses found on Genius for a .txt, only written when Genius could be reached."""
+    input_path = Path(input_file_name)
+    return input_path.parent / f"{input_path.stem}_genius_cache.json"
+
 def genius_get_choruses(input_file_name, artist=None, title=None, use_cache=True):
     input_path = Path(input_file_name)
-    cache_file = input_path.parent / f"{input_path.stem}_genius_cache.json"
+    cache_file = genius_cache_path(input_file_name)
 
 # International chorus terms
     terms = [
@@ -441,14 +666,60 @@ def genius_get_choruses(input_file_name, artist=None, title=None, use_cache=True
         
     return choruses
 
+class BeatRanges:
+    """Beat ranges (start and end beat included) that are tested for overlap with bisect instead of one by one.
+
+    Overlapping ranges are merged so the others stay sorted by both start and end, and only the first
+    range ending at or after a start can overlap. A range ending before its start (a window across
+    the two singers of a duet) can't be merged, those are compared one by one.
+    """
+
+    def __init__(self):
+        self._starts = []
+        self._ends = []
+        self._reversed = []
+        self._all = []
+
+    @staticmethod
+    def _overlap(start, end, other_start, other_end):
+        return not (end < other_start or start > other_end)
+
+    def overlaps(self, start, end):
+        if start > end:
+            return any(self._overlap(start, end, s, e) for s, e in self._all)
+        if any(self._overlap(start, end, s, e) for s, e in self._reversed):
+            return True
+        i = bisect.bisect_left(self._ends, start)
+        return i < len(self._starts) and self._starts[i] <= end
+
+    def add(self, start, end):
+        self._all.append((start, end))
+        if start > end:
+            self._reversed.append((start, end))
+            return
+        first = bisect.bisect_left(self._ends, start)
+        last = bisect.bisect_right(self._starts, end)
+        if first < last:
+            start = min(start, self._starts[first])
+            end = max(end, self._ends[last - 1])
+        self._starts[first:last] = [start]
+        self._ends[first:last] = [end]
+
 def recover_repeats_from_txt(lyrics_map_list, matched_choruses):
     words = [l['lyrics'].lower().strip() for l in lyrics_map_list]
     new_matches = []
+
+    # index of the first word starting and ending on each beat
+    start_indexes = {}
+    end_indexes = {}
+    for i, l in enumerate(lyrics_map_list):
+        start_indexes.setdefault(l['start_beat'], i)
+        end_indexes.setdefault(l['end_beat'], i)
     
     confirmed_texts = []
     for m in matched_choruses:
-        start_idx = next((i for i, l in enumerate(lyrics_map_list) if l['start_beat'] == m['start_beat']), 0)
-        end_idx = next((i for i, l in enumerate(lyrics_map_list) if l['end_beat'] == m['end_beat']), len(lyrics_map_list)-1)
+        start_idx = start_indexes.get(m['start_beat'], 0)
+        end_idx = end_indexes.get(m['end_beat'], len(lyrics_map_list)-1)
         
         segment_text = ' '.join(words[start_idx:end_idx+1])
         clean_segment = re.sub(r'[^\w\s]', '', segment_text)
@@ -456,34 +727,42 @@ def recover_repeats_from_txt(lyrics_map_list, matched_choruses):
         if len(clean_segment) > 20: 
             confirmed_texts.append(clean_segment)
 
+    # the cleaned text of a window is its cleaned words joined together, a slice of clean_text
+    clean_words = [re.sub(r'[^\w\s]', '', w) for w in words]
+    clean_text = ''.join(clean_words)
+    word_offsets = list(itertools.accumulate((len(w) for w in clean_words), initial=0))
+    used_ranges = BeatRanges()
+    for m in matched_choruses:
+        used_ranges.add(m['start_beat'], m['end_beat'])
+
     for target_text in confirmed_texts:
         target_len = len(target_text.split()) # contagem aproximada de palavras
         target_clean = target_text.replace(' ', '')
+        target_counts = Counter(target_clean)
+        similarities = {}
         
         for win_size in range(max(1, target_len - 2), target_len + 3):
              if win_size > len(words): continue
              
              for i in range(len(words) - win_size + 1):
-                window_text = ''.join(words[i:i+win_size])
-                window_clean = re.sub(r'[^\w\s]', '', window_text)
+                window_start = word_offsets[i]
+                window_end = word_offsets[i + win_size]
                 
-                if abs(len(target_clean) - len(window_clean)) > len(target_clean) * 0.2: continue
+                if abs(len(target_clean) - (window_end - window_start)) > len(target_clean) * 0.2: continue
                 
-                if SequenceMatcher(None, target_clean, window_clean).ratio() > 0.90:
-                    match_data = {
-                        'start_beat': lyrics_map_list[i]['start_beat'],
-                        'end_beat': lyrics_map_list[i+win_size-1]['end_beat']
-                    }
-                    
-                    overlap = False
-                    all_existing = matched_choruses + new_matches
-                    for existing in all_existing:
-                        if not (match_data['end_beat'] < existing['start_beat'] or match_data['start_beat'] > existing['end_beat']):
-                            overlap = True
-                            break
-                    
-                    if not overlap:
-                        new_matches.append(match_data)
+                # the overlap doesn't depend on the text, so it is checked before the slower similarity
+                match_data = word_positions_to_beats(lyrics_map_list, i, i + win_size)
+                if used_ranges.overlaps(match_data['start_beat'], match_data['end_beat']): continue
+
+                window_clean = clean_text[window_start:window_end]
+                if not may_reach_ratio(target_clean, window_clean, target_counts, Counter(window_clean), 0.90): continue
+                similarity = similarities.get(window_clean)
+                if similarity is None:
+                    similarity = similarities[window_clean] = SequenceMatcher(None, target_clean, window_clean).ratio()
+                
+                if similarity > 0.90:
+                    new_matches.append(match_data)
+                    used_ranges.add(match_data['start_beat'], match_data['end_beat'])
 
     return new_matches
 
@@ -492,25 +771,40 @@ def match_choruses_to_beats(lyrics_map_list, genius_choruses, similarity_thresho
     used_ranges = []
     
     words = [l['lyrics'].lower().strip() for l in lyrics_map_list]
+    # the cleaned text of a window is its cleaned words joined by spaces, so the lyrics are cleaned once
+    # and a window is the slice clean_text[word_offsets[i]:word_offsets[i + win_size] - 1]
+    clean_words = [re.sub(r'[^\w\s]', '', w) for w in words]
+    clean_text = ' '.join(clean_words)
+    word_offsets = [0]
+    for w in clean_words:
+        word_offsets.append(word_offsets[-1] + len(w) + 1)
 
     for chorus_text in genius_choruses:
         chorus_text_clean = re.sub(r'[\(\[\]\)]', ' ', chorus_text)
         chorus_clean = re.sub(r'[^\w\s]', '', chorus_text_clean.lower())
+        chorus_len = len(chorus_clean)
         c_len = len(chorus_clean.split())
         best_match = None
         best_sim = 0
 
         for win_size in range(max(1, c_len - 5), c_len + 5):
-            if win_size > len(words): continue
+            # nothing beats an exact match
+            if win_size > len(words) or best_sim >= 1: break
             
             for i in range(len(words) - win_size + 1):
-                win_text = ' '.join(words[i:i + win_size])
-                win_clean = re.sub(r'[^\w\s]', '', win_text)
+                win_start = word_offsets[i]
+                win_end = word_offsets[i + win_size] - 1
+                win_len = win_end - win_start
                 
-                if abs(len(chorus_clean) - len(win_clean)) > len(chorus_clean) * 0.4: continue
+                if abs(chorus_len - win_len) > chorus_len * 0.4: continue
                 
-                dist = levenshtein_distance(chorus_clean, win_clean)
-                sim = 1 - (dist / max(len(chorus_clean), len(win_clean)))
+                # a window further than max_dist edits can't beat best_sim, the + 1 is a margin for the float rounding
+                longest = max(chorus_len, win_len)
+                max_dist = int((1 - best_sim) * longest) + 1
+                if abs(chorus_len - win_len) > max_dist: continue
+                dist = levenshtein_distance(chorus_clean, clean_text[win_start:win_end], score_cutoff=max_dist)
+                if dist > max_dist: continue
+                sim = 1 - (dist / longest)
 
                 if sim > best_sim:
                     beats = word_positions_to_beats(lyrics_map_list, i, i + win_size)
@@ -518,7 +812,7 @@ def match_choruses_to_beats(lyrics_map_list, genius_choruses, similarity_thresho
                         overlaps = any(not (beats['end_beat'] < u['start_beat'] or beats['start_beat'] > u['end_beat']) for u in used_ranges)
                         if not overlaps:
                             best_sim = sim
-                            best_match = {'beats': beats, 'sim': sim, 'txt': win_text}
+                            best_match = {'beats': beats, 'sim': sim, 'txt': ' '.join(words[i:i + win_size])}
 
         if best_match and best_match['sim'] >= similarity_threshold:
             log_debug(f"MATCH: {best_match['sim']:.2f} | TXT: {best_match['txt'][:30]}...")
@@ -0,0 +1,199 @@
+"""Times the lyrics side of the conversion (UltrastarToSingit) on generated UltraStar songs.
+
+Run from the repository root:
+    python -m benchmarks.LyricsBenchmark                  # compare with the stored baseline
+    python -m benchmarks.LyricsBenchmark --full           # up to 20,000 notes and 10,000 songs (about 40 minutes)
+    python -m benchmarks.LyricsBenchmark --save-baseline  # store the results as the new baseline
+
+The stored baseline is a --full run, the sizes left out of a run aren't compared.
+"""
+import argparse
+import json
+import logging
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import UltrastarToSingit  # noqa: E402
+from benchmarks.SyntheticSongs import SongSpec, write_song  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+BASELINE_FILE = Path(__file__).resolve().parent / 'baselines' / 'lyrics.json'
+
+NOTE_COUNTS = [100, 1000]
+FULL_NOTE_COUNTS = NOTE_COUNTS + [5000, 20000]
+SONG_COUNTS = [10, 100]
+FULL_SONG_COUNTS = SONG_COUNTS + [1000, 10000]
+
+# notes per page of a typical song, and its size for the corpus runs
+NOTES_PER_PAGE = 10
+CORPUS_NOTE_COUNT = 600
+CORPUS_ENCODINGS = ['utf-8', 'cp1252', 'utf-8-sig', 'utf-16']
+
+
+def song_spec(note_count, duet=False, encoding='utf-8') -> SongSpec:
+    return SongSpec(note_count=note_count, page_count=max(1, note_count // NOTES_PER_PAGE), duet=duet,
+                    encoding=encoding)
+
+
+def _best_time(func, setup, repeats) -> float:
+    """Shortest of repeats runs of func(setup()), setup isn't timed."""
+    times = []
+    for _ in range(repeats):
+        arg = setup()
+        start = time.perf_counter()
+        func(arg)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def benchmark_song_size(note_count, work_dir, repeats=3) -> dict:
+    """Seconds taken by each step of the conversion of one song with note_count notes."""
+    txt_file = Path(work_dir) / f'notes_{note_count}.txt'
+    song = write_song(txt_file, song_spec(note_count))
+
+    def parsed():
+        return UltrastarToSingit.parse_file(txt_file)
+
+    def parsed_again():
+        # the encoding of a file is only detected once per run
+        UltrastarToSingit._encoding_memo.clear()
+        return parsed()
+
+    # map_data fills the lyrics_map_list of the parsed song
+    us_data = parsed()
+    sing_it = UltrastarToSingit.map_data(us_data, song.duration, 0, txt_file)
+    lyrics_map_list = us_data['lyrics_map_list']
+
+    return {
+        'parse_file': _best_time(lambda _: parsed_again(), lambda: None, repeats),
+        'map_data': _best_time(lambda us: UltrastarToSingit.map_data(us, song.duration, 0, txt_file), parsed, repeats),
+        'find_refrains': _best_time(UltrastarToSingit.find_refrains, lambda: dict(sing_it, pages=list(sing_it['pages'])),
+                                    repeats),
+        'match_choruses_to_beats': _best_time(
+            lambda choruses: UltrastarToSingit.match_choruses_to_beats(lyrics_map_list, choruses), lambda: song.choruses,
+            repeats),
+        'write_vxla_file': _best_time(
+            lambda _: UltrastarToSingit.write_vxla_file(sing_it, 'song.vxla', work_dir, song.duration, UltrastarToSingit.JSON),
+            lambda: None, repeats),
+    }
+
+
+def benchmark_corpus(song_count, work_dir) -> dict:
+    """Seconds taken by each step to convert the lyrics of song_count typical songs (some duets, mixed encodings)."""
+    corpus_dir = Path(work_dir) / f'songs_{song_count}'
+    songs = []
+    for i in range(song_count):
+        spec = song_spec(CORPUS_NOTE_COUNT, duet=i % 5 == 4, encoding=CORPUS_ENCODINGS[i % len(CORPUS_ENCODINGS)])
+        # one folder per song like the real ones, the build cache of a folder keeps the guessed encodings
+        txt_file = corpus_dir / f'song_{i}' / f'song_{i}.txt'
+        songs.append((txt_file, write_song(txt_file, spec, seed=i)))
+
+    totals = {'parse_file': 0.0, 'map_data': 0.0, 'write_vxla_file': 0.0}
+    start = time.perf_counter()
+    for txt_file, song in songs:
+        step_start = time.perf_counter()
+        us_data = UltrastarToSingit.parse_file(txt_file)
+        mapped_at = time.perf_counter()
+        sing_it = UltrastarToSingit.map_data(us_data, song.duration, 0, txt_file)
+        written_at = time.perf_counter()
+        UltrastarToSingit.write_vxla_file(sing_it, txt_file.stem + '.vxla', txt_file.parent, song.duration,
+                                          UltrastarToSingit.JSON)
+        end = time.perf_counter()
+        totals['parse_file'] += mapped_at - step_start
+        totals['map_data'] += written_at - mapped_at
+        totals['write_vxla_file'] += end - written_at
+    totals['total'] = time.perf_counter() - start
+    totals['songs_per_second'] = song_count / totals['total'] if totals['total'] else 0.0
+    return totals
+
+
+def run(note_counts, song_counts, repeats=3) -> dict:
+    results = {'notes': {}, 'songs': {}}
+    with tempfile.TemporaryDirectory(prefix='lyrics_benchmark_') as work_dir:
+        for note_count in note_counts:
+            # the big songs take long enough for a single run to be stable
+            results['notes'][str(note_count)] = benchmark_song_size(note_count, work_dir,
+                                                                    repeats if note_count <= 1000 else 1)
+            _print_row(f'{note_count} notes', results['notes'][str(note_count)])
+        for song_count in song_counts:
+            results['songs'][str(song_count)] = benchmark_corpus(song_count, work_dir)
+            _print_row(f'{song_count} songs', results['songs'][str(song_count)])
+    return results
+
+
+def _print_row(name, timings) -> None:
+    print(f'{name:>12}: ' + ', '.join(f'{step} {seconds:.4f}' for step, seconds in timings.items()), flush=True)
+
+
+def load_baseline() -> dict:
+    if not BASELINE_FILE.exists():
+        return {}
+    with open(BASELINE_FILE, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_baseline(results) -> None:
+    BASELINE_FILE.parent.mkdir(parents=True, exist_ok=True)
+    data = {
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'python': platform.python_version(),
+        'results': results,
+    }
+    with open(BASELINE_FILE, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+        f.write('\n')
+    print(f'Baseline saved to {BASELINE_FILE}')
+
+
+def compare(results, baseline) -> None:
+    """Print the time of each step relative to the baseline (below 1 is faster)."""
+    base_results = baseline.get('results', {})
+    print(f'\nCompared with the baseline ({baseline.get("python", "?")} on {baseline.get("machine", "?")}), '
+          f'time now / time then:')
+    for scale, entries in results.items():
+        for size, timings in entries.items():
+            base = base_results.get(scale, {}).get(size)
+            if not base:
+                continue
+            ratios = {step: seconds / base[step] for step, seconds in timings.items()
+                      if step != 'songs_per_second' and base.get(step)}
+            print(f'{size:>6} {scale:<5}: ' + ', '.join(f'{step} x{ratio:.2f}' for step, ratio in ratios.items()))
+    ratios = [seconds / base_results[scale][size][step]
+              for scale, entries in results.items() for size, timings in entries.items()
+              for step, seconds in timings.items()
+              if step != 'songs_per_second' and base_results.get(scale, {}).get(size, {}).get(step)]
+    if ratios:
+        print(f'Geometric mean: x{statistics.geometric_mean(ratios):.2f}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--full', action='store_true',
+                        help='Also run the 5,000 and 20,000 notes songs and the 1,000 and 10,000 songs corpora')
+    parser.add_argument('--notes', type=int, nargs='*', help='Note counts of the single song runs')
+    parser.add_argument('--songs', type=int, nargs='*', help='Song counts of the corpus runs')
+    parser.add_argument('--repeats', type=int, default=3, help='Runs of each single song step, the fastest counts')
+    parser.add_argument('--save-baseline', action='store_true', help='Store the results as the new baseline')
+    args = parser.parse_args()
+
+    note_counts = args.notes if args.notes is not None else (FULL_NOTE_COUNTS if args.full else NOTE_COUNTS)
+    song_counts = args.songs if args.songs is not None else (FULL_SONG_COUNTS if args.full else SONG_COUNTS)
+    results = run(note_counts, song_counts, max(1, args.repeats))
+    if args.save_baseline:
+        save_baseline(results)
+    else:
+        baseline = load_baseline()
+        if baseline:
+            compare(results, baseline)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+"""Times the media side of the conversion (ffmpeg, binkc) on generated song folders, no real songs needed.
+
+Every song folder gets a lavfi testsrc video, a sine tone, a solid colour cover and a generated UltraStar
+file, then the whole convert_files pipeline runs on them. binkc is replaced by a stand-in that copies its
+input, so the JSON format runs without RAD Video Tools (and its time isn't representative). Needs ffmpeg
+and ffprobe, Linux/macOS only because of the binkc stand-in.
+
+Run from the repository root:
+    python -m benchmarks.MediaBenchmark --songs 4 --length 120
+    python -m benchmarks.MediaBenchmark --format json --still 0.5 --jobs 2
+"""
+import argparse
+import logging
+import os
+import stat
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import ConvertFiles  # noqa: E402
+from ConfigLoader import load_config  # noqa: E402
+from benchmarks.SyntheticSongs import SongSpec, write_song  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+# a DLC of each output format, the rest of its ids come from the DLC database
+XML_DLC_ID = '0100CC30149B9002'
+JSON_DLC_ID = '01001C101ED11002'
+
+COVER_COLOURS = ['red', 'green', 'blue', 'orange', 'purple', 'teal', 'yellow', 'gray']
+NOTES_PER_SECOND = 3
+
+BINKC_STAND_IN = f'''#!{sys.executable}
+# binkc stand-in of the media benchmark: "<this> binkc <input> <output> /switches...", copies the input
+import shutil
+import sys
+
+shutil.copyfile(sys.argv[2], sys.argv[3])
+'''
+
+
+def _ffmpeg(ffmpeg_path, args) -> None:
+    subprocess.run([ffmpeg_path, '-v', 'error', '-y'] + args, check=True)
+
+
+def generate_song_folders(input_dir, song_count, length, size, still_fraction, ffmpeg_path='ffmpeg') -> list:
+    """Create song_count song folders of length seconds, still_fraction of them without a video."""
+    folders = []
+    still_count = round(song_count * still_fraction)
+    for i in range(song_count):
+        folder = Path(input_dir) / f'Benchmark {i:03d} - Song {i:03d}'
+        folder.mkdir(parents=True, exist_ok=True)
+        name = folder.name
+        if i >= still_count:
+            _ffmpeg(ffmpeg_path, ['-f', 'lavfi', '-i', f'testsrc=size={size}:rate=25:duration={length}',
+                                  '-c:v', 'libx264', '-preset', 'veryfast', '-pix_fmt', 'yuv420p',
+                                  os.fspath(folder / f'{name}.mp4')])
+        _ffmpeg(ffmpeg_path, ['-f', 'lavfi', '-i', f'sine=frequency={220 + 20 * i}:duration={length}',
+                              '-c:a', 'libmp3lame', '-b:a', '192k', os.fspath(folder / f'{name}.mp3')])
+        _ffmpeg(ffmpeg_path, ['-f', 'lavfi', '-i', f'color=c={COVER_COLOURS[i % len(COVER_COLOURS)]}:size=600x600',
+                              '-frames:v', '1', os.fspath(folder / f'{name}.jpg')])
+        note_count = max(10, int(length * NOTES_PER_SECOND))
+        write_song(folder / f'{name}.txt', SongSpec(note_count=note_count, page_count=max(1, note_count // 10)),
+                   seed=i, title=f'Song {i:03d}', artist=f'Benchmark {i:03d}')
+        folders.append(folder)
+    return folders
+
+
+def write_binkc_stand_in(directory) -> Path:
+    path = Path(directory) / 'binkc'
+    path.write_text(BINKC_STAND_IN, encoding='utf-8')
+    path.chmod(path.stat().st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+    return path
+
+
+def run(work_dir, args) -> float:
+    """Convert the generated songs of work_dir, returns the wall time."""
+    cfg = load_config()
+    cfg.dlc.id = JSON_DLC_ID if args.format == 'json' else XML_DLC_ID
+    cfg.folders.input = os.fspath(Path(work_dir) / 'songs')
+    cfg.folders.output = os.fspath(Path(work_dir) / 'output')
+    cfg.tools.ffmpeg_path = args.ffmpeg if args.ffmpeg != 'ffmpeg' else None
+    cfg.tools.rad_path = os.fspath(write_binkc_stand_in(work_dir))
+    cfg.conversion_tweaks.enable = True
+    cfg.conversion_tweaks.jobs = args.jobs
+    cfg.conversion_tweaks.video_encode_mode = args.video_encode_mode
+    cfg.conversion_tweaks.run_report = args.report
+    start = time.perf_counter()
+    ConvertFiles.main(cfg)
+    return time.perf_counter() - start
+
+
+def print_results(song_count, length, wall_time) -> None:
+    report = ConvertFiles._run_report
+    print(f'\n{song_count} songs of {length}s in {wall_time:.1f}s: {song_count * 3600 / wall_time:.0f} songs/hour, '
+          f'{song_count * length / wall_time:.1f}s of song converted per second')
+    if report.subprocess_cpu_time is not None:
+        print(f'CPU time of ffmpeg/binkc: {report.subprocess_cpu_time:.1f}s')
+    print('Stage             total s   per song s   tools s     MB in      MB out')
+    stages = {}
+    for record in report.records:
+        stages.setdefault(record.stage, []).append(record)
+    for stage, records in sorted(stages.items(), key=lambda item: -sum(r.wall_time for r in item[1])):
+        total = sum(r.wall_time for r in records)
+        print(f'{stage:<16} {total:8.2f} {total / len(records):12.2f} {sum(r.subprocess_wall_time for r in records):9.2f} '
+              f'{sum(r.input_bytes for r in records) / 2 ** 20:9.1f} {sum(r.output_bytes for r in records) / 2 ** 20:11.1f}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--songs', type=int, default=4, help='Number of generated songs (default: 4)')
+    parser.add_argument('--length', type=float, default=120, help='Length of each song in seconds (default: 120)')
+    parser.add_argument('--size', default='1280x720', help='Video size of the generated songs (default: 1280x720)')
+    parser.add_argument('--still', type=float, default=0.25,
+                        help='Fraction of the songs without a video, converted to a still cover video (default: 0.25)')
+    parser.add_argument('--format', choices=['xml', 'json'], default='xml',
+                        help='"xml" for Let\'s Sing 2022 and older, "json" for 2024+ with the binkc stand-in (default: xml)')
+    parser.add_argument('--jobs', '-j', type=int, default=1, help='Songs converted in parallel, 0 for auto (default: 1)')
+    parser.add_argument('--video-encode-mode', choices=[ConvertFiles.TWO_PASS, ConvertFiles.CRF], default=ConvertFiles.TWO_PASS)
+    parser.add_argument('--ffmpeg', default='ffmpeg', help='ffmpeg executable, ffprobe must be next to it or on the PATH')
+    parser.add_argument('--keep', metavar='DIR',
+                        help='Generate the songs in DIR and keep them, a second run then measures an incremental rebuild')
+    parser.add_argument('--report', action='store_true', help='Write the run report next to the converted output')
+    parser.add_argument('--verbose', '-v', action='store_true', help='Show the conversion log')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING, format='%(levelname)s: %(message)s')
+
+    with tempfile.TemporaryDirectory(prefix='media_benchmark_') as temp_dir:
+        work_dir = Path(args.keep or temp_dir)
+        songs_dir = work_dir / 'songs'
+        if not songs_dir.is_dir():
+            print(f'Generating {args.songs} songs of {args.length:g}s in {songs_dir}', flush=True)
+            generate_song_folders(songs_dir, args.songs, args.length, args.size, args.still, args.ffmpeg)
+        song_count = sum(1 for d in songs_dir.iterdir() if d.is_dir())
+        wall_time = run(work_dir, args)
+        print_results(song_count, args.length, wall_time)
+
+
+if __name__ == '__main__':
+    main()
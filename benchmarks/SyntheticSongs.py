@@ -0,0 +1,122 @@
+import json
+import random
+from dataclasses import dataclass
+from pathlib import Path
+
+# cp1252 compatible, so every encoding can store them
+WORDS = [
+    'love', 'night', 'heart', 'dance', 'fire', 'dream', 'baby', 'forever', 'tonight', 'shine',
+    'river', 'golden', 'together', 'remember', 'million', 'stars', 'away', 'higher', 'believe', 'never',
+    'café', 'naïve', 'mañana', 'über', 'déjà', 'señorita', 'corazón', 'fiancée', 'rendez-vous', 'jalapeño',
+]
+
+
+@dataclass
+class SongSpec:
+    """Shape of a generated UltraStar song."""
+    bpm: float = 300.0
+    note_count: int = 600
+    page_count: int = 60
+    chorus_pages: int = 4  # pages of the chorus block
+    chorus_repeats: int = 3  # times the chorus block is sung
+    duet: bool = False
+    encoding: str = 'utf-8'
+    gap_ms: int = 1000
+
+
+@dataclass
+class SyntheticSong:
+    text: str
+    choruses: list  # the chorus as Genius would list it, once per time it is sung
+    duration: float  # seconds, up to the end of the last note
+
+
+def _syllables(word, rng) -> list:
+    if len(word) < 5 or rng.random() < 0.3:
+        return [word]
+    cut = rng.randint(2, len(word) - 2)
+    return [word[:cut], word[cut:]]
+
+
+def _page_words(rng, note_count) -> list:
+    """Words whose syllables add up to note_count notes (a word may get a held '~' note)."""
+    words = []
+    notes = 0
+    while notes < note_count:
+        syllables = _syllables(rng.choice(WORDS), rng)[:note_count - notes]
+        if notes + len(syllables) < note_count and rng.random() < 0.1:
+            syllables.append('~')
+        words.append(syllables)
+        notes += len(syllables)
+    return words
+
+
+def _singer_lines(spec, rng, page_count, note_count) -> tuple:
+    """Note lines of one singer and the words of its chorus block."""
+    notes_per_page = max(1, note_count // max(1, page_count))
+    chorus_pages = min(spec.chorus_pages, page_count) if spec.chorus_repeats else 0
+    chorus = [_page_words(rng, notes_per_page) for _ in range(chorus_pages)]
+    repeats = min(spec.chorus_repeats, page_count // chorus_pages) if chorus_pages else 0
+    # chorus blocks spread evenly over the song, verses in between
+    chorus_starts = {round(i * page_count / repeats) for i in range(repeats)} if repeats else set()
+    pages = []
+    while len(pages) < page_count:
+        if len(pages) in chorus_starts and len(pages) + chorus_pages <= page_count:
+            pages.extend(chorus)
+        else:
+            pages.append(_page_words(rng, notes_per_page))
+
+    lines = []
+    beat = 0
+    for page_number, page in enumerate(pages):
+        for word_number, syllables in enumerate(page):
+            for syllable_number, syllable in enumerate(syllables):
+                length = rng.choice((1, 2, 2, 3, 4, 6))
+                note_type = rng.choices((':', '*', 'F'), weights=(90, 8, 2))[0]
+                text = syllable
+                if syllable_number == 0 and word_number > 0 and syllable != '~':
+                    text = ' ' + text
+                lines.append(f'{note_type} {beat} {length} {rng.randint(0, 24)} {text}')
+                beat += length + rng.choice((0, 0, 1))
+        if page_number < len(pages) - 1:
+            beat += 4
+            lines.append(f'- {beat}')
+            beat += 2
+    return lines, chorus, beat
+
+
+def generate_song(spec, seed=0, title='Synthetic Song', artist='Benchmark') -> SyntheticSong:
+    rng = random.Random(seed)
+    header = [f'#TITLE:{title}', f'#ARTIST:{artist}', '#LANGUAGE:English', '#GENRE:Pop', '#YEAR:2000',
+              f'#BPM:{spec.bpm:g}', f'#GAP:{spec.gap_ms}']
+    singers = 2 if spec.duet else 1
+    lines = []
+    chorus = []
+    last_beat = 0
+    for singer in range(singers):
+        singer_lines, singer_chorus, end_beat = _singer_lines(spec, rng, max(1, spec.page_count // singers),
+                                                              spec.note_count // singers)
+        if spec.duet:
+            header.append(f'#P{singer + 1}:Singer {singer + 1}')
+            lines.append(f'P{singer + 1}')
+        lines.extend(singer_lines)
+        chorus = chorus or singer_chorus
+        last_beat = max(last_beat, end_beat)
+    lines.append('E')
+
+    chorus_text = '\n'.join(' '.join(''.join(s for s in word if s != '~') for word in page) for page in chorus)
+    choruses = [chorus_text] * spec.chorus_repeats if chorus_text else []
+    duration = last_beat * 60 / spec.bpm / 4 + spec.gap_ms / 1000
+    return SyntheticSong('\n'.join(header + lines) + '\n', choruses, duration)
+
+
+def write_song(txt_file, spec, seed=0, title='Synthetic Song', artist='Benchmark') -> SyntheticSong:
+    """Write a generated song, along with the Genius cache of its choruses so it converts offline."""
+    txt_file = Path(txt_file)
+    song = generate_song(spec, seed, title, artist)
+    txt_file.parent.mkdir(parents=True, exist_ok=True)
+    txt_file.write_bytes(song.text.encode(spec.encoding))
+    genius_cache = txt_file.parent / f'{txt_file.stem}_genius_cache.json'
+    with open(genius_cache, 'w', encoding='utf-8') as f:
+        json.dump({'url': None, 'choruses': song.choruses}, f, indent=2, ensure_ascii=False)
+    return song
@@ -0,0 +1,116 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from BuildCache import CACHE_FILE_NAME, BuildCache, cached_build  # noqa: E402
+
+
+class BuildCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        BuildCache.reset()
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self.dir = Path(self._temp_dir.name)
+        self.input = self.dir / 'song.mp3'
+        self.input.write_bytes(b'audio')
+        self.output = self.dir / 'song.ogg'
+        self.builds = 0
+
+    def tearDown(self):
+        BuildCache.reset()
+        self._temp_dir.cleanup()
+
+    def build(self):
+        self.builds += 1
+        self.output.write_bytes(b'encoded')
+
+    def cached_build(self, cache, params=None, adopt=True) -> bool:
+        return cached_build(cache, 'ogg', self.build, [self.input], [self.output], params, adopt)
+
+    def test_unchanged_input_is_not_rebuilt(self):
+        cache = BuildCache(self.dir)
+        self.assertTrue(self.cached_build(cache))
+        self.assertFalse(self.cached_build(cache))
+        self.assertEqual(self.builds, 1)
+
+    def test_touched_input_falls_back_to_the_content_hash(self):
+        cache = BuildCache(self.dir)
+        self.cached_build(cache)
+        stat = self.input.stat()
+        os.utime(self.input, ns=(stat.st_atime_ns, stat.st_mtime_ns + 5_000_000_000))
+        self.assertFalse(self.cached_build(cache))
+        self.assertEqual(self.builds, 1)
+        # the new mtime is remembered for the fast path
+        entry = cache._data['artifacts']['ogg']['inputs'][0]
+        self.assertEqual(entry['mtime_ns'], self.input.stat().st_mtime_ns)
+
+    def test_changed_content_of_the_same_size_is_rebuilt(self):
+        cache = BuildCache(self.dir)
+        self.cached_build(cache)
+        stat = self.input.stat()
+        self.input.write_bytes(b'AUDIO')
+        os.utime(self.input, ns=(stat.st_atime_ns, stat.st_mtime_ns + 5_000_000_000))
+        self.assertTrue(self.cached_build(cache))
+        self.assertEqual(self.builds, 2)
+
+    def test_changed_params_are_rebuilt(self):
+        cache = BuildCache(self.dir)
+        self.cached_build(cache, params={'rate': 48000})
+        self.assertTrue(self.cached_build(cache, params={'rate': 44100}))
+
+    def test_existing_output_is_adopted(self):
+        self.output.write_bytes(b'converted before the cache existed')
+        cache = BuildCache(self.dir)
+        self.assertFalse(self.cached_build(cache))
+        self.assertEqual(self.builds, 0)
+        self.assertIn('ogg', cache._data['artifacts'])
+
+    def test_existing_output_is_rebuilt_without_adopt(self):
+        self.output.write_bytes(b'converted before the cache existed')
+        self.assertTrue(self.cached_build(BuildCache(self.dir), adopt=False))
+        self.assertEqual(self.output.read_bytes(), b'encoded')
+
+    def test_output_of_another_artifact_is_not_adopted(self):
+        cache = BuildCache(self.dir)
+        cache.record('other', [self.input], [self.output])
+        self.output.write_bytes(b'built by the other artifact')
+        self.assertTrue(self.cached_build(cache))
+
+    def test_forget_removes_the_entry(self):
+        cache = BuildCache(self.dir)
+        self.cached_build(cache)
+        cache.forget('ogg')
+        with open(self.dir / CACHE_FILE_NAME, encoding='utf-8') as f:
+            self.assertNotIn('ogg', json.load(f)['artifacts'])
+        self.assertTrue(self.cached_build(cache, adopt=False))
+        self.assertEqual(self.builds, 2)
+
+    def test_failed_build_leaves_no_output(self):
+        cache = BuildCache(self.dir)
+
+        def failing_build():
+            self.output.write_bytes(b'partial')
+            raise RuntimeError('encoder crashed')
+
+        with self.assertRaises(RuntimeError):
+            cached_build(cache, 'ogg', failing_build, [self.input], [self.output])
+        self.assertFalse(self.output.exists())
+        self.assertNotIn('ogg', cache._data['artifacts'])
+
+    def test_reset_reads_the_cache_again(self):
+        cache = BuildCache.for_dir(self.dir)
+        self.assertIs(BuildCache.for_dir(self.dir), cache)
+        self.cached_build(cache)
+        (self.dir / CACHE_FILE_NAME).unlink()
+        BuildCache.reset()
+        self.assertIsNot(BuildCache.for_dir(self.dir), cache)
+        self.assertNotIn('ogg', BuildCache.for_dir(self.dir)._data['artifacts'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import sys
+import threading
+import time
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import ConvertFiles  # noqa: E402
+from ConfigLoader import load_default_config  # noqa: E402
+from TaskGraph import TaskGraph  # noqa: E402
+
+
+def settings_with_budget(units) -> ConvertFiles.ConversionSettings:
+    cfg = load_default_config()
+    cfg.conversion_tweaks.cpu_budget = units
+    return ConvertFiles.ConversionSettings.from_config(cfg)
+
+
+class HeavyTaskCostTest(unittest.TestCase):
+
+    def test_heavy_task_leaves_a_unit_on_a_small_machine(self):
+        settings = settings_with_budget(4)
+        self.assertEqual(settings.ffmpeg_pool.max_encoders, 1)
+        self.assertEqual(settings.heavy_task_cost(), 3)
+
+    def test_single_core_budget_still_runs_heavy_tasks(self):
+        self.assertEqual(settings_with_budget(1).heavy_task_cost(), 1)
+
+    def test_light_task_runs_while_a_heavy_task_holds_its_units(self):
+        settings = settings_with_budget(4)
+        graph = TaskGraph(settings.cpu_budget, name='song')
+        light_done = threading.Event()
+        overlapped = []
+
+        def video():
+            # the encode only finishes early if the audio gets a unit while it runs
+            overlapped.append(light_done.wait(timeout=5))
+
+        def audio():
+            time.sleep(0.05)
+            light_done.set()
+
+        graph.add('video', video, outputs=['video.mp4'], cost=settings.heavy_task_cost())
+        graph.add('audio', audio, outputs=['audio.ogg'])
+        graph.run()
+        self.assertEqual(overlapped, [True])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+import os
+import shutil
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from FfmpegPool import HEAVY, FfmpegPool  # noqa: E402
+
+
+class WithThreadsTest(unittest.TestCase):
+
+    def test_single_output_gets_threads(self):
+        cmd = FfmpegPool.with_threads(['ffmpeg', '-i', 'in.mp4', '-c:v', 'libx264', 'out.mp4'], 3)
+        self.assertEqual(cmd, ['ffmpeg', '-filter_threads', '3', '-i', 'in.mp4', '-c:v', 'libx264',
+                               '-threads', '3', 'out.mp4'])
+
+    def test_every_output_gets_threads(self):
+        cmd = ['ffmpeg', '-i', 'song.mp3', '-filter_complex', 'split[full][preview]',
+               '-map', '[full]', '-ar', '48000', 'full.ogg',
+               '-map', '[preview]', '-ar', '48000', 'preview.ogg']
+        threaded = FfmpegPool.with_threads(cmd, 2, outputs=['full.ogg', Path('preview.ogg')])
+        self.assertEqual(threaded[threaded.index('full.ogg') - 2:threaded.index('full.ogg')], ['-threads', '2'])
+        self.assertEqual(threaded[-3:], ['-threads', '2', 'preview.ogg'])
+        self.assertEqual(threaded.count('-threads'), 2)
+
+
+@unittest.skipIf(shutil.which('ffmpeg') is None, 'ffmpeg is not installed')
+class ProgressListenerTest(unittest.TestCase):
+
+    def test_progress_carries_the_span_of_the_command(self):
+        pool = FfmpegPool(cpu_count=2, max_encoders=1)
+        reports = []
+        cmd = ['ffmpeg', '-y', '-f', 'lavfi', '-i', 'testsrc=duration=1:size=64x64:rate=10', '-f', 'null', os.devnull]
+        with pool.progress_listener(reports.append):
+            pool.run(cmd, HEAVY, progress_span=(0.5, 1.0))
+            pool.run(cmd, HEAVY)
+        self.assertTrue(reports)
+        spans = [report['span'] for report in reports]
+        self.assertEqual(spans[0], (0.5, 1.0))
+        self.assertEqual(spans[-1], (0.0, 1.0))
+        self.assertTrue(all(report['kind'] == HEAVY for report in reports))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import FilePlacement  # noqa: E402
+from FilePlacement import COPY, HARDLINK, SYMLINK, place_file  # noqa: E402
+
+
+class PlaceFileTest(unittest.TestCase):
+
+    def setUp(self):
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self.dir = Path(self._temp_dir.name)
+        self.source = self.dir / 'song.ogg'
+        self.source.write_bytes(b'audio')
+        self.destination = self.dir / 'placed.ogg'
+
+    def tearDown(self):
+        self._temp_dir.cleanup()
+
+    def test_copy(self):
+        self.assertEqual(place_file(self.source, self.destination, COPY), COPY)
+        self.assertEqual(self.destination.read_bytes(), b'audio')
+        self.assertFalse(os.path.samefile(self.source, self.destination))
+
+    def test_hardlink(self):
+        self.assertEqual(place_file(self.source, self.destination, HARDLINK), HARDLINK)
+        self.assertTrue(os.path.samefile(self.source, self.destination))
+
+    @unittest.skipIf(os.name == 'nt', 'symlinks need privileges on Windows')
+    def test_symlink(self):
+        self.assertEqual(place_file(self.source, self.destination, SYMLINK), SYMLINK)
+        self.assertTrue(self.destination.is_symlink())
+
+    def test_existing_destination_is_replaced(self):
+        self.destination.write_bytes(b'older audio')
+        place_file(self.source, self.destination, HARDLINK)
+        self.assertEqual(self.destination.read_bytes(), b'audio')
+
+    def test_failed_link_falls_back_to_a_copy(self):
+        with mock.patch.object(FilePlacement.os, 'link', side_effect=OSError('cross-device link')):
+            self.assertEqual(place_file(self.source, self.destination, HARDLINK), COPY)
+        self.assertEqual(self.destination.read_bytes(), b'audio')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from OutputManifest import OutputManifest  # noqa: E402
+
+
+class OutputManifestTest(unittest.TestCase):
+
+    def setUp(self):
+        self._temp_dir = tempfile.TemporaryDirectory()
+        root = Path(self._temp_dir.name)
+        self.song_dir = root / 'song'
+        self.song_dir.mkdir()
+        self.output_dir = root / 'output'
+        self.source = self.song_dir / 'song.ogg'
+        self.source.write_bytes(b'audio')
+        self.destination = self.output_dir / 'audio' / 'song.ogg'
+
+    def tearDown(self):
+        self._temp_dir.cleanup()
+
+    def test_unchanged_source_is_placed_once(self):
+        manifest = OutputManifest(self.output_dir)
+        self.assertTrue(manifest.place('song', self.source, self.destination))
+        self.assertFalse(manifest.place('song', self.source, self.destination))
+        self.assertEqual(self.destination.read_bytes(), b'audio')
+
+    def test_manifest_survives_a_new_run(self):
+        manifest = OutputManifest(self.output_dir)
+        manifest.set_song('song', 'Artist - Title', {'TITLE': 'Title', 'ARTIST': 'Artist', 'BPM': '120'})
+        manifest.place('song', self.source, self.destination)
+        manifest.save()
+        manifest = OutputManifest(self.output_dir)
+        self.assertEqual(manifest.songs['song']['tags'], {'TITLE': 'Title', 'ARTIST': 'Artist'})
+        self.assertEqual(manifest.name_id_for_dir('Artist - Title'), 'song')
+        self.assertFalse(manifest.place('song', self.source, self.destination))
+
+    def test_non_incremental_place_always_copies(self):
+        manifest = OutputManifest(self.output_dir)
+        manifest.place('song', self.source, self.destination)
+        self.assertTrue(manifest.place('song', self.source, self.destination, incremental=False))
+
+    def test_stale_files_are_removed(self):
+        manifest = OutputManifest(self.output_dir)
+        old_destination = self.output_dir / 'video' / 'song.mp4'
+        manifest.place('song', self.source, old_destination)
+        manifest.save()
+
+        manifest = OutputManifest(self.output_dir)
+        manifest.place('song', self.source, self.destination)
+        manifest.remove_stale_files()
+        self.assertFalse(old_destination.exists())
+        self.assertTrue(self.destination.exists())
+        self.assertEqual(list(manifest.songs['song']['files']), ['audio/song.ogg'])
+
+    def test_remove_song_deletes_its_files(self):
+        manifest = OutputManifest(self.output_dir)
+        manifest.place('song', self.source, self.destination)
+        manifest.remove_song('song')
+        self.assertFalse(self.destination.exists())
+        self.assertNotIn('song', manifest.songs)
+
+
+if __name__ == '__main__':
+    unittest.main()
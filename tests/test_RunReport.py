@@ -0,0 +1,59 @@
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import RunReport  # noqa: E402
+
+
+class RunReportTest(unittest.TestCase):
+
+    def setUp(self):
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self.dir = Path(self._temp_dir.name)
+        self.input = self.dir / 'song.mp3'
+        self.input.write_bytes(b'x' * 100)
+        self.output = self.dir / 'song.ogg'
+
+    def tearDown(self):
+        self._temp_dir.cleanup()
+
+    def test_stage_records_file_sizes_and_tools(self):
+        report = RunReport.RunReport()
+        with report.stage('song', 'audio', [self.input], [self.output]):
+            self.output.write_bytes(b'x' * 40)
+            RunReport.record_subprocess(0, 1.5)
+        record, = report.records
+        self.assertEqual((record.input_bytes, record.output_bytes), (100, 40))
+        self.assertEqual((record.subprocess_count, record.subprocess_wall_time, record.exit_codes), (1, 1.5, [0]))
+
+    def test_cached_stage_records_no_bytes(self):
+        report = RunReport.RunReport()
+        self.output.write_bytes(b'x' * 40)
+        with report.stage('song', 'audio', [self.input], [self.output]) as record:
+            record.status = 'cached'
+        self.assertEqual((record.input_bytes, record.output_bytes), (0, 0))
+
+    def test_song_time_counts_parallel_stages_once(self):
+        report = RunReport.RunReport()
+        report.records = [RunReport.StageRecord('song', 'video', start=0.0, wall_time=4.0),
+                          RunReport.StageRecord('song', 'audio', start=1.0, wall_time=1.0),
+                          RunReport.StageRecord('song', 'video/encode', start=0.0, wall_time=4.0),
+                          RunReport.StageRecord('song', 'vxla', start=5.0, wall_time=2.0)]
+        self.assertEqual(report.song_times(), {'song': 6.0})
+
+    def test_write(self):
+        report = RunReport.RunReport()
+        with report.stage('song', 'audio', [self.input]):
+            pass
+        report.finish()
+        report.write(self.dir)
+        self.assertTrue((self.dir / RunReport.REPORT_JSON_FILE_NAME).exists())
+        header = (self.dir / RunReport.REPORT_CSV_FILE_NAME).read_text(encoding='utf-8').splitlines()[0]
+        self.assertIn('input_bytes', header)
+
+
+if __name__ == '__main__':
+    unittest.main()
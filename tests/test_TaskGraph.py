@@ -0,0 +1,107 @@
+import sys
+import threading
+import time
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import TaskGraph  # noqa: E402
+from TaskGraph import CpuBudget, TaskGraph as Graph  # noqa: E402
+
+
+def acquire_in_thread(budget, cost, started):
+    def run():
+        budget.acquire(cost)
+        started.append(cost)
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
+
+
+class CpuBudgetTest(unittest.TestCase):
+
+    def test_light_reservation_goes_ahead_of_a_waiting_heavy_one(self):
+        budget = CpuBudget(4)
+        budget.acquire(3)  # an encode of another song
+        started = []
+        heavy = acquire_in_thread(budget, 3, started)
+        time.sleep(0.05)
+        light = acquire_in_thread(budget, 1, started)
+        light.join(timeout=1)
+        self.assertEqual(started, [1])
+        budget.release(3)
+        budget.release(1)
+        heavy.join(timeout=1)
+        self.assertEqual(started, [1, 3])
+
+    def test_waiting_reservation_is_only_bypassed_a_few_times(self):
+        budget = CpuBudget(2)
+        budget.acquire(1)
+        started = []
+        heavy = acquire_in_thread(budget, 2, started)
+        time.sleep(0.05)
+        for _ in range(TaskGraph.MAX_BYPASSES):
+            acquire_in_thread(budget, 1, started).join(timeout=1)
+            budget.release(1)
+        blocked = acquire_in_thread(budget, 1, started)
+        blocked.join(timeout=0.2)
+        self.assertTrue(blocked.is_alive())
+        self.assertNotIn(2, started)
+        budget.release(1)
+        heavy.join(timeout=1)
+        self.assertIn(2, started)
+        budget.release(2)
+        blocked.join(timeout=1)
+        self.assertFalse(blocked.is_alive())
+
+    def test_cost_is_clamped_to_the_budget(self):
+        budget = CpuBudget(2)
+        self.assertEqual(budget.acquire(16), 2)
+
+
+class TaskGraphTest(unittest.TestCase):
+
+    def test_tasks_run_after_the_tasks_producing_their_inputs(self):
+        graph = Graph(CpuBudget(4))
+        order = []
+        graph.add('vxla', lambda: order.append('vxla'), inputs=['song.txt', 'song.ogg'], outputs=['song.vxla'])
+        graph.add('audio', lambda: order.append('audio'), inputs=['song.mp3'], outputs=['song.ogg'])
+        graph.run()
+        self.assertEqual(order, ['audio', 'vxla'])
+
+    def test_dependents_of_a_failed_task_are_skipped(self):
+        graph = Graph(CpuBudget(2))
+        ran = []
+
+        def fail():
+            raise RuntimeError('ffmpeg failed')
+
+        graph.add('audio', fail, outputs=['song.ogg'])
+        graph.add('vxla', lambda: ran.append('vxla'), inputs=['song.ogg'], outputs=['song.vxla'])
+        graph.add('covers', lambda: ran.append('covers'), inputs=['song.jpg'], outputs=['song.png'])
+        with self.assertRaises(RuntimeError):
+            graph.run()
+        self.assertEqual(ran, ['covers'])
+
+    def test_cycles_are_rejected(self):
+        graph = Graph(CpuBudget(1))
+        graph.add('a', lambda: None, inputs=['b.out'], outputs=['a.out'])
+        graph.add('b', lambda: None, inputs=['a.out'], outputs=['b.out'])
+        with self.assertRaises(ValueError):
+            graph.run()
+
+    def test_cost_function_is_called_once_the_dependencies_are_done(self):
+        budget = CpuBudget(4)
+        graph = Graph(budget)
+        video_done = []
+        reserved = []
+        graph.add('video', lambda: video_done.append(True), outputs=['song.mp4'])
+        graph.add('still_video', lambda: reserved.append(budget.units - budget._available), inputs=['song.mp4'],
+                  outputs=['cover.mp4'], cost=lambda: 1 if video_done else 3)
+        graph.run()
+        self.assertEqual(reserved, [1])
+
+
+if __name__ == '__main__':
+    unittest.main()
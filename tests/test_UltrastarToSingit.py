@@ -0,0 +1,52 @@
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import UltrastarToSingit  # noqa: E402
+
+SONG_BODY = [': 0 4 60 Hel', ': 4 4 62 lo ', '- 10', ': 12 4 64 world', 'E']
+
+
+class ParseFileTest(unittest.TestCase):
+
+    def setUp(self):
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self.file = Path(self._temp_dir.name) / 'song.txt'
+
+    def tearDown(self):
+        self._temp_dir.cleanup()
+
+    def parse(self, tags) -> dict:
+        self.file.write_text('\n'.join(['#TITLE:Song', '#ARTIST:Band'] + tags + SONG_BODY) + '\n', encoding='utf-8')
+        return UltrastarToSingit.parse_file(self.file)
+
+    def test_numeric_tags(self):
+        header = self.parse(['#BPM:300,5', '#GAP:1500', '#VIDEOGAP:0.5', '#PREVIEWSTART:12.5',
+                             '#MEDLEYSTARTBEAT:4', '#MEDLEYENDBEAT:12'])['header']
+        self.assertEqual((header.bpm, header.gap, header.video_gap, header.preview_start), (300.5, 1.5, 0.5, 12.5))
+        self.assertTrue(header.has_medley)
+
+    def test_invalid_unused_tag_is_ignored(self):
+        # the medley tags decide the preview, the broken PREVIEWSTART is not needed
+        with self.assertLogs(UltrastarToSingit.logger, 'WARNING'):
+            data = self.parse(['#BPM:300', '#GAP:0', '#PREVIEWSTART:abc', '#MEDLEYSTARTBEAT:4', '#MEDLEYENDBEAT:12'])
+        self.assertIsNone(data['header'].preview_start)
+        self.assertTrue(data['header'].has_medley)
+        self.assertEqual(len(data['notes']), len(SONG_BODY))
+
+    def test_invalid_optional_tags_get_their_defaults(self):
+        with self.assertLogs(UltrastarToSingit.logger, 'WARNING'):
+            header = self.parse(['#BPM:300', '#VIDEOGAP:x', '#MEDLEYSTARTBEAT:4.5'])['header']
+        self.assertEqual(header.video_gap, 0.0)
+        self.assertFalse(header.has_medley)
+
+    def test_invalid_bpm_is_an_error(self):
+        with self.assertRaises(ValueError):
+            self.parse(['#BPM:fast'])
+
+
+if __name__ == '__main__':
+    unittest.main()